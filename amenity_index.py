@@ -0,0 +1,85 @@
+import sqlite3
+import json
+import itertools
+import numpy as np
+
+# Indeks udogodnień: słownik nazw + bity udogodnień każdej oferty spakowane w bajty
+class AmenityIndex:
+    def __init__(self, names, bits):
+        self.names = list(names)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        self.bits = bits
+
+    @staticmethod
+    def _encode(rows, positions):
+        # pozycje bitów udogodnień każdej oferty; nowe nazwy dopisywane do positions
+        listing_positions = []
+        for row in rows:
+            try:
+                amenities = json.loads(row) if row else []
+            except ValueError:
+                amenities = []
+            listing_positions.append([positions.setdefault(amenity, len(positions)) for amenity in amenities])
+        return listing_positions
+
+    @staticmethod
+    def _pack(listing_positions, width):
+        # bity ustawiane wprost w spakowanej tablicy - bez pośredniej macierzy bool oferty x udogodnienia
+        bits = np.zeros((len(listing_positions), (max(width, 1) + 7) // 8), dtype=np.uint8)
+        counts = [len(cols) for cols in listing_positions]
+        rows = np.repeat(np.arange(len(listing_positions)), counts)
+        positions = np.fromiter(itertools.chain.from_iterable(listing_positions), dtype=np.int64, count=sum(counts))
+        np.bitwise_or.at(bits, (rows, positions >> 3), (1 << (positions & 7)).astype(np.uint8))
+        return bits
+
+    @classmethod
+    def from_json_rows(cls, rows):
+        # rows - teksty JSON z kolumny amenities, w kolejności ofert
+        positions = {}
+        bits = cls._pack(cls._encode(rows, positions), len(positions))
+        names = sorted(positions, key=positions.get)
+        return cls(names, bits)
+
+    def append(self, rows):
+        # nowy indeks z dopisanymi ofertami; nowe udogodnienia dostają kolejne bity
+        positions = dict(self.positions)
+        new_bits = self._pack(self._encode(rows, positions), len(positions))
+        old_bits = self.bits
+        if new_bits.shape[1] > old_bits.shape[1]:
+            old_bits = np.pad(old_bits, ((0, 0), (0, new_bits.shape[1] - old_bits.shape[1])))
+        names = sorted(positions, key=positions.get)
+        return AmenityIndex(names, np.vstack([old_bits, new_bits]))
+
+    @classmethod
+    def from_db(cls, db_path='airbnb.db'):
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT amenities FROM truncated_listings WHERE amenities IS NOT NULL')
+        index = cls.from_json_rows(row[0] for row in cursor)
+        conn.close()
+        return index
+
+    def _column(self, amenity):
+        position = self.positions[amenity]
+        return (self.bits[:, position >> 3] & np.uint8(1 << (position & 7))) != 0
+
+    def mask(self, amenities):
+        # oferty mające wszystkie wskazane udogodnienia (dokładne dopasowanie nazw)
+        mask = np.ones(len(self.bits), dtype=bool)
+        for amenity in amenities:
+            if amenity not in self.positions:
+                return np.zeros(len(self.bits), dtype=bool)
+            mask &= self._column(amenity)
+        return mask
+
+    def counts(self, alive=None, chunk_size=4096):
+        # liczba ofert z każdym udogodnieniem, liczona wprost z bitów;
+        # alive - maska aktualnych ofert (bez usuniętych i zastąpionych nowszą wersją)
+        totals = np.zeros(len(self.names), dtype=np.int64)
+        for start in range(0, len(self.bits), chunk_size):
+            bits = self.bits[start:start + chunk_size]
+            if alive is not None:
+                bits = bits[alive[start:start + chunk_size]]
+            chunk = np.unpackbits(bits, axis=1, bitorder='little', count=len(self.names))
+            totals += chunk.sum(axis=0, dtype=np.int64)
+        return dict(zip(self.names, totals.tolist()))
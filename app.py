@@ -1,21 +1,175 @@
-from flask import Flask, render_template, request, jsonify, url_for
-from search_engine import SearchEngine
+from flask import Flask, Response, render_template, request, jsonify, url_for
+from search_engine import SearchEngine, SIMILARITY_MEASURES, RANGE_FILTERS
+from result_cache import ResultCache
+from similar_listings import SimilarListings
+from term_suggester import SUGGEST_LIMIT
+from metrics import Registry, render_values
 import os
+import math
+import time
+import logging
 import json
 import sqlite3
+import hashlib
+import threading
+from urllib.request import pathname2url
+import numpy as np
 
-# Inicjalizacja aplikacji Flasapp.config['DATABASE'] = 'airbnb.db'k i wyszukiwania
+# Inicjalizacja aplikacji Flask i wyszukiwania
 app = Flask(__name__)
+# Poziom logowania z LOG_LEVEL (domyślnie WARNING - komunikaty debug nie są nawet formatowane)
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'WARNING').upper(),
+                    format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+logger = logging.getLogger(__name__)
+# Ścieżka do bazy danych, można ją zmienić zmienną środowiskową AIRBNB_DB
+app.config['DATABASE'] = os.environ.get('AIRBNB_DB', 'airbnb.db')
 
 # Inicjalizacja silnika wyszukiwania
-search_engine = SearchEngine('airbnb.db')
+app.config['SEARCH_INDEX'] = os.environ.get('SEARCH_INDEX', 'search_index')
+# Token dla endpointów administracyjnych; bez niego są wyłączone
+app.config['ADMIN_TOKEN'] = os.environ.get('ADMIN_TOKEN')
+
+# Indeks z dysku (build_index.py) jest mapowany do pamięci, jeśli odpowiada zawartości bazy.
+# W trybie współdzielonym (gunicorn.conf.py) indeks zbudował proces nadrzędny - workery tylko go mapują.
+search_engine = SearchEngine(app.config['DATABASE'], index_path=app.config['SEARCH_INDEX'],
+                             verify_index=os.environ.get('SEARCH_INDEX_SHARED') != '1')
+
+# Tabela podobnych ofert liczona offline (similar_listings.py), mapowana z dysku; None - brak tabeli
+app.config['SIMILAR_LISTINGS'] = os.environ.get('SIMILAR_LISTINGS', 'similar_listings')
+similar_listings = SimilarListings.load(app.config['SIMILAR_LISTINGS'])
+if similar_listings is not None and similar_listings.fingerprint != search_engine.fingerprint:
+    logger.warning("Similar listings in %s were computed for different data, recompute them with similar_listings.py",
+                   app.config['SIMILAR_LISTINGS'])
+
+# Pamięć podręczna odpowiedzi /search (LRU + TTL w sekundach)
+result_cache = ResultCache(maxsize=int(os.environ.get('RESULT_CACHE_SIZE', 1024)),
+                           ttl=float(os.environ.get('RESULT_CACHE_TTL', 300)))
+
+# Metryki /search: czas całego żądania i poszczególnych etapów (eksport w /metrics)
+metrics_registry = Registry()
+search_latency = metrics_registry.histogram('search_request_duration_seconds',
+                                            'Latency of /search requests', 'cache')
+stage_latency = metrics_registry.histogram('search_stage_duration_seconds',
+                                           'Latency of /search stages', 'stage')
+batch_latency = metrics_registry.histogram('search_batch_request_duration_seconds',
+                                           'Latency of /search/batch requests')
+batch_queries = metrics_registry.counter('search_batch_queries_total', 'Queries answered by /search/batch')
+
+# Maksymalna liczba zapytań w jednym żądaniu /search/batch
+MAX_BATCH_QUERIES = int(os.environ.get('MAX_BATCH_QUERIES', 500))
+
+# Pula połączeń: jedno połączenie tylko do odczytu na wątek, otwierane raz i używane ponownie
+db_connections = threading.local()
 
 #połączenie z bazą danych
 def get_db_connection():
-    conn = sqlite3.connect('airbnb.db')
-    conn.row_factory = sqlite3.Row
+    db_path = app.config['DATABASE']
+    conn = getattr(db_connections, 'conn', None)
+    if conn is None or db_connections.path != db_path:
+        conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro",
+                               uri=True, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA query_only = ON')
+        conn.execute('PRAGMA mmap_size = 268435456')
+        conn.execute('PRAGMA cache_size = -65536')
+        db_connections.conn = conn
+        db_connections.path = db_path
     return conn
 
+def parse_amenities(value):
+    return json.loads(value) if value else []
+
+def column_field(column):
+    return ([column], lambda listing: listing[column])
+
+# Pola oferty zwracane do przeglądarki: nazwa pola -> (potrzebne kolumny bazy, wartość z wiersza)
+LISTING_FIELDS = {
+    'id': column_field('id'),
+    'name': (['name_en'], lambda listing: listing['name_en']),
+    'host_response_time': column_field('host_response_time'),
+    'neighbourhood': (['neighbourhood_cleansed'], lambda listing: listing['neighbourhood_cleansed']),
+    'property_type': column_field('property_type'),
+    'room_type': column_field('room_type'),
+    'accommodates': column_field('accommodates'),
+    'bathrooms': (['bathrooms_text'], lambda listing: listing['bathrooms_text']),
+    'bedrooms': column_field('bedrooms'),
+    'beds': column_field('beds'),
+    'amenities': (['amenities'], lambda listing: parse_amenities(listing['amenities'])),
+    # kilka pierwszych udogodnień do karty wyniku
+    'amenities_preview': (['amenities'], lambda listing: parse_amenities(listing['amenities'])[:5]),
+    'review_scores_rating': column_field('review_scores_rating'),
+    'price': (['price'], lambda listing: f"€{listing['price']} per night"),
+    'listing_url': column_field('listing_url'),
+    'description': (['description_en'], lambda listing: listing['description_en'] or "No description"),
+    'neighborhood_overview': (['neighborhood_overview_en'],
+                              lambda listing: listing['neighborhood_overview_en'] or "No neighborhood overview"),
+    'host_about': (['host_about_en'], lambda listing: listing['host_about_en'] or "No host information"),
+    'minimum_nights': column_field('minimum_nights'),
+    'maximum_nights': column_field('maximum_nights'),
+    'host_name': column_field('host_name'),
+    'host_since': column_field('host_since'),
+    'host_location': column_field('host_location'),
+    'host_response_rate': column_field('host_response_rate'),
+    'host_acceptance_rate': column_field('host_acceptance_rate'),
+    'host_is_superhost': column_field('host_is_superhost'),
+    'host_listings_count': column_field('host_listings_count'),
+    'host_identity_verified': column_field('host_identity_verified'),
+    'number_of_reviews': (['number_of_reviews'], lambda listing: int(listing['number_of_reviews'])
+                          if listing['number_of_reviews'] is not None else 0),
+    'review_scores_accuracy': column_field('review_scores_accuracy'),
+    'review_scores_cleanliness': column_field('review_scores_cleanliness'),
+    'review_scores_checkin': column_field('review_scores_checkin'),
+    'review_scores_communication': column_field('review_scores_communication'),
+    'review_scores_location': column_field('review_scores_location'),
+    'review_scores_value': column_field('review_scores_value')
+}
+
+# Pełne dane oferty (/listing/<id>)
+LISTING_DETAIL_FIELDS = [field for field in LISTING_FIELDS if field != 'amenities_preview']
+
+# Domyślny, skrócony zestaw pól w wynikach /search - tylko to, co pokazuje karta wyniku.
+# Pełne dane oferty zwraca /listing/<id>.
+SEARCH_FIELDS = [
+    'id', 'name', 'price', 'property_type', 'room_type', 'neighbourhood',
+    'review_scores_rating', 'number_of_reviews', 'accommodates', 'amenities_preview'
+]
+
+# Lista pól z żądania (lista albo tekst rozdzielony przecinkami); None przy nieznanym polu
+def parse_fields(value, default):
+    if value is None:
+        return list(default)
+    if isinstance(value, str):
+        value = [field.strip() for field in value.split(',') if field.strip()]
+    if not isinstance(value, list) or not all(isinstance(field, str) and field in LISTING_FIELDS for field in value):
+        return None
+    # id jest zawsze zwracane
+    return ['id'] + [field for field in dict.fromkeys(value) if field != 'id']
+
+# Pobranie wielu ofert jednym zapytaniem WHERE id IN (...), wynik jako słownik id -> wiersz.
+# Wybierane są tylko kolumny potrzebne do wskazanych pól.
+def fetch_listings(conn, listing_ids, fields=None):
+    if not listing_ids:
+        return {}
+    columns = ['id']
+    for field in fields or LISTING_DETAIL_FIELDS:
+        columns.extend(column for column in LISTING_FIELDS[field][0] if column not in columns)
+    listing_ids = list(listing_ids)
+    listings = {}
+    # paczki po 500 id - limit parametrów zapytania SQLite
+    for start in range(0, len(listing_ids), 500):
+        chunk = listing_ids[start:start + 500]
+        cursor = conn.execute(f'''
+            SELECT {", ".join(columns)}
+            FROM truncated_listings
+            WHERE id IN ({", ".join("?" * len(chunk))})
+        ''', chunk)
+        listings.update((row['id'], row) for row in cursor.fetchall())
+    return listings
+
+# Zamiana wiersza bazy (sqlite3.Row) na słownik zwracany do przeglądarki
+def listing_to_dict(listing, fields=None):
+    return {field: LISTING_FIELDS[field][1](listing) for field in fields or LISTING_DETAIL_FIELDS}
+
 # Funkcja pobierająca opcje filtrów z bazy danych
 def get_filter_options():
     conn = get_db_connection()
@@ -34,13 +188,9 @@ def get_filter_options():
             cursor.execute(f'SELECT DISTINCT {column} FROM truncated_listings WHERE {column} IS NOT NULL')
             filters[column] = sorted([row[0] for row in cursor.fetchall()])
         else:
-            # Dla udogodnień, pobierz wszystkie unikalne udogodnienia i ich częstotliwość
-            cursor.execute('SELECT amenities FROM truncated_listings WHERE amenities IS NOT NULL')
-            all_amenities = {}
-            for row in cursor.fetchall():
-                amenities = json.loads(row[0])
-                for amenity in amenities:
-                    all_amenities[amenity] = all_amenities.get(amenity, 0) + 1
+            # Dla udogodnień częstotliwości pochodzą wprost z indeksu udogodnień silnika
+            index = search_engine.index
+            all_amenities = index.amenity_index.counts(index.alive)
             
             # Filtrowanie udogodnień, które pojawiają się w więcej niż 12000 ofertach
             common_amenities = [(amenity, count) for amenity, count in all_amenities.items() if count > 12000]
@@ -49,9 +199,17 @@ def get_filter_options():
     # Pobranie minimalnych i maksymalnych wartości dla pól numerycznych
     numeric_ranges = {}
     
-    # Osobna obsługa ceny, ponieważ jest przechowywana jako tekst z punktami dziesiętnymi
-    cursor.execute('SELECT MIN(CAST(REPLACE(price, ".","") AS INTEGER)), MAX(CAST(REPLACE(price, ".","") AS INTEGER)) FROM truncated_listings WHERE price IS NOT NULL')
-    min_price, max_price = cursor.fetchone()
+    # Osobna obsługa ceny: kolumna price_cents (clean_data.py) korzysta z indeksu,
+    # w starszej bazie bez tej kolumny zakres pochodzi z cen sparsowanych w silniku
+    cursor.execute("PRAGMA table_info(truncated_listings)")
+    if 'price_cents' in [col[1] for col in cursor.fetchall()]:
+        cursor.execute('SELECT MIN(price_cents), MAX(price_cents) FROM truncated_listings WHERE price_cents IS NOT NULL')
+        min_price, max_price = cursor.fetchone()
+    else:
+        prices = search_engine.attributes['price']
+        prices = prices[~np.isnan(prices)]
+        min_price = int(round(prices.min() * 100)) if len(prices) else None
+        max_price = int(round(prices.max() * 100)) if len(prices) else None
     numeric_ranges['price'] = {'min': float(min_price)/100 if min_price else 0, 'max': float(max_price)/100 if max_price else 1000}
     
     # Obsługa pozostałych pól numerycznych
@@ -60,15 +218,61 @@ def get_filter_options():
         min_val, max_val = cursor.fetchone()
         numeric_ranges[field] = {'min': min_val, 'max': max_val}
     
-    conn.close()
     return filters, numeric_ranges
 
+# Wersja bazy danych na podstawie czasu modyfikacji i rozmiaru plików (także pliku WAL)
+def get_database_version(db_path=None):
+    db_path = db_path or app.config['DATABASE']
+    version = []
+    for path in (db_path, db_path + '-wal'):
+        try:
+            stat = os.stat(path)
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            version.append(None)
+    return tuple(version)
+
+# Wersja danych wyszukiwarki: baza + indeks (łącznie z niezapisanymi zmianami przyrostowymi)
+def get_data_version():
+    return (get_database_version(), search_engine.fingerprint, search_engine.pending_changes)
+
+# Pamięć podręczna opcji filtrów - przeliczana tylko po zmianie bazy lub indeksu
+filter_options_cache = {'version': None, 'filters': None, 'numeric_ranges': None, 'etag': None}
+filter_options_lock = threading.Lock()
+
+def get_cached_filter_options():
+    version = get_data_version()
+    with filter_options_lock:
+        if filter_options_cache['version'] != version:
+            filters, numeric_ranges = get_filter_options()
+            payload = json.dumps({'filters': filters, 'numeric_ranges': numeric_ranges}, sort_keys=True)
+            filter_options_cache.update({
+                'version': version,
+                'filters': filters,
+                'numeric_ranges': numeric_ranges,
+                'etag': hashlib.sha256(payload.encode('utf-8')).hexdigest()
+            })
+        return filter_options_cache['filters'], filter_options_cache['numeric_ranges'], filter_options_cache['etag']
+
+# Jawne unieważnienie, np. po przebudowie bazy bez zmiany czasu modyfikacji pliku
+def invalidate_filter_options():
+    with filter_options_lock:
+        filter_options_cache['version'] = None
+
+# Opcje filtrów w JSON z nagłówkiem ETag, przeglądarka może je cache'ować
+@app.route('/filter-options')
+def filter_options():
+    filters, numeric_ranges, etag = get_cached_filter_options()
+    response = jsonify({'filters': filters, 'numeric_ranges': numeric_ranges})
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
 # Strona główna aplikacji
 @app.route('/')
 def index():
     # Pobranie opcji filtrów i zakresów numerycznych
-    filters, numeric_ranges = get_filter_options()
-    similarity_metrics = ['cosine', 'jaccard', 'dice']
+    filters, numeric_ranges, _ = get_cached_filter_options()
+    similarity_metrics = SIMILARITY_MEASURES
     
     photos_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'Sicily_photo')
     
@@ -78,7 +282,7 @@ def index():
     try:
         photo_files = [f for f in os.listdir(photos_dir) if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
     except Exception as e:
-        print(f"Błąd odczytu katalogu ze zdjęciami: {e}")
+        logger.warning("Błąd odczytu katalogu ze zdjęciami: %s", e)
         photo_files = []
     
     return render_template('index.html', 
@@ -93,200 +297,263 @@ def search():
     # Pobranie danych z żądania
     data = request.get_json()
     query = data.get('query', '')
-    filters = data.get('filters', {})
-    print(f"Debug - Received filters: {filters}")
-    
-    # Aktualizacja miary podobieństwa
-    similarity_metric = filters.get('similarity_metric', 'cosine')
-    if similarity_metric != search_engine.similarity_measure:
-        search_engine.similarity_measure = similarity_metric
-    
-    search_results = search_engine.search(query)
+    logger.debug("Received filters: %s", data.get('filters', {}))
+    request_start = time.perf_counter()
+    timings = {}
+    options, error = parse_search_options(data)
+    if error:
+        return jsonify({'error': error}), 400
+    filters, offset, limit, fields, similarity_metric = options
+
+    # Klucz pamięci podręcznej: zapytanie po analizie (tokeny + lematy), miara, filtry w postaci kanonicznej i strona
+    cache_filters = {key: value for key, value in filters.items() if key != 'similarity_metric'}
+    if isinstance(cache_filters.get('amenities'), list):
+        cache_filters['amenities'] = sorted(cache_filters['amenities'])
+    stage_start = time.perf_counter()
+    cache_key = (search_engine.process_text(query), similarity_metric,
+                 json.dumps(cache_filters, sort_keys=True, default=str), offset, limit, tuple(fields))
+    timings['analysis'] = time.perf_counter() - stage_start
+    data_version = get_data_version()
+    payload = result_cache.get(cache_key, data_version)
+    if payload is not None:
+        return timed_response(payload, timings, 'hit', request_start)
+
+    # Filtry strukturalne (cena, liczba gości, typ, dzielnica, udogodnienia itd.) są stosowane w silniku przed wyborem top-k
+    search_results = search_engine.search(query, top_k=limit, offset=offset, filters=filters,
+                                          similarity_measure=similarity_metric, timings=timings)
     results = search_results['results']
     total_matches = search_results['total_matches']
     
-    filtered_results = []
+    # Jedno zapytanie po wszystkie oferty ze strony wyników zamiast osobnego SELECT dla każdej
+    stage_start = time.perf_counter()
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
+    listings = fetch_listings(conn, [result['listing_id'] for result in results], fields)
+
+    filtered_results = hydrate_results(results, listings, fields)
+    timings['hydration'] = time.perf_counter() - stage_start
+    payload = {
+        'total_matches': total_matches,
+        # słowa zapytania zastąpione najbliższym słowem ze słownika (literówki)
+        'corrections': search_results['corrections'],
+        # liczba trafień po filtrach (do stronicowania), nie tylko na tej stronie
+        'total_filtered': search_results['total_filtered'],
+        'offset': offset,
+        'limit': limit,
+        'results': filtered_results
+    }
+    result_cache.put(cache_key, data_version, payload)
+    return timed_response(payload, timings, 'miss', request_start)
+
+# Wiele zapytań w jednym żądaniu (widżety rekomendacji, zadania wsadowe): wspólne filtry, miara i strona,
+# jedno liczenie podobieństw dla wszystkich zapytań i jeden odczyt ofert z bazy
+@app.route('/search/batch', methods=['POST'])
+def search_batch():
+    data = request.get_json()
+    request_start = time.perf_counter()
+    queries = data.get('queries')
+    if not isinstance(queries, list) or not queries or not all(isinstance(query, str) for query in queries):
+        return jsonify({'error': 'queries must be a non-empty list of strings'}), 400
+    if len(queries) > MAX_BATCH_QUERIES:
+        return jsonify({'error': f'at most {MAX_BATCH_QUERIES} queries per batch'}), 400
+    options, error = parse_search_options(data)
+    if error:
+        return jsonify({'error': error}), 400
+    filters, offset, limit, fields, similarity_metric = options
+
+    search_results = search_engine.search_many(queries, top_k=limit, offset=offset, filters=filters,
+                                               similarity_measure=similarity_metric)
+    listing_ids = {result['listing_id'] for query_results in search_results for result in query_results['results']}
+    listings = fetch_listings(get_db_connection(), listing_ids, fields)
+    batch = []
+    for query, query_results in zip(queries, search_results):
+        results = hydrate_results(query_results['results'], listings, fields)
+        batch.append({
+            'query': query,
+            'total_matches': query_results['total_matches'],
+            'corrections': query_results['corrections'],
+            'total_filtered': query_results['total_filtered'],
+            'results': results
+        })
+    response = jsonify({'offset': offset, 'limit': limit, 'results': batch})
+    batch_latency.observe(time.perf_counter() - request_start)
+    batch_queries.inc(amount=len(queries))
+    return response
+
+# Wspólne parametry /search i /search/batch: (filtry, offset, limit, pola, miara) albo komunikat błędu
+def parse_search_options(data):
+    filters = data.get('filters') or {}
+    if not isinstance(filters, dict):
+        return None, 'filters must be an object'
+
+    # Stronicowanie wyników
+    try:
+        offset = max(int(data.get('offset', 0)), 0)
+        limit = min(max(int(data.get('limit', 20)), 1), 100)
+    except (TypeError, ValueError):
+        return None, 'offset and limit must be integers'
+
+    # Projekcja pól wyników, domyślnie skrócony zestaw dla kart
+    fields = parse_fields(data.get('fields'), SEARCH_FIELDS)
+    if fields is None:
+        return None, f'fields must be a list of: {", ".join(LISTING_FIELDS)}'
+
+    # Zakresy liczbowe: [min, max], każda granica liczbą albo null
+    for key in list(RANGE_FILTERS) + ['review_scores_rating_range']:
+        if key in filters and not (isinstance(filters[key], list) and len(filters[key]) == 2
+                                   and all(value is None or is_number(value) for value in filters[key])):
+            return None, f'{key} must be a list [min, max] of numbers or null'
+    if filters.get('min_reviews') is not None and not is_number(filters['min_reviews']):
+        return None, 'min_reviews must be a number'
+    if 'amenities' in filters and not (isinstance(filters['amenities'], list)
+                                       and all(isinstance(amenity, str) for amenity in filters['amenities'])):
+        return None, 'amenities must be a list of strings'
+
+    # Filtry przestrzenne: bbox [south, west, north, east], near {lat, lon, radius_km}; skończone liczby
+    try:
+        if filters.get('bbox'):
+            bbox = [float(value) for value in filters['bbox']]
+            if len(bbox) != 4 or not all(math.isfinite(value) for value in bbox):
+                raise ValueError
+        if filters.get('near'):
+            near = [float(filters['near'][key]) for key in ('lat', 'lon', 'radius_km')]
+            if not all(math.isfinite(value) for value in near) or near[2] < 0:
+                raise ValueError
+    except (TypeError, ValueError, KeyError):
+        return None, 'bbox must be [south, west, north, east] and near must be {lat, lon, radius_km >= 0}'
+
+    # Miara podobieństwa przekazywana do zapytania - bez zmiany współdzielonego silnika
+    similarity_metric = filters.get('similarity_metric', 'cosine')
+    if similarity_metric not in SIMILARITY_MEASURES:
+        return None, f'unknown similarity metric: {similarity_metric}'
+    return (filters, offset, limit, fields, similarity_metric), None
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+# Wyniki rankingu uzupełnione danymi ofert, w kolejności rankingu
+def hydrate_results(results, listings, fields):
+    default_image_url = url_for('static', filename='Sicily_photo/Sicily_photo.jpg')
+    hydrated = []
     for result in results:
-        listing_id = result['listing_id']
-        similarity_score = result['similarity_score']
-        
-        query_conditions = ["1=1"]  # Zawsze prawdziwy warunek jako początek
-        query_params = []
-        
-        if listing_id:
-            query_conditions.append("id = ?")
-            query_params.append(listing_id)
-            
-        if 'price_range' in filters:
-            price_min, price_max = filters['price_range']
-            if price_min is not None:
-                query_conditions.append("CAST(REPLACE(REPLACE(price, '€', ''), ',', '') AS DECIMAL) >= ?")
-                query_params.append(price_min)
-                
-            if price_max is not None:
-                query_conditions.append("CAST(REPLACE(REPLACE(price, '€', ''), ',', '') AS DECIMAL) <= ?")
-                query_params.append(price_max)
-                
-        if 'min_reviews' in filters:
-            min_reviews = filters['min_reviews']
-            if min_reviews is not None:
-                query_conditions.append("number_of_reviews >= ?")
-                query_params.append(min_reviews)
-                
-        if 'accommodates_range' in filters:
-            accommodates_min, accommodates_max = filters['accommodates_range']
-            if accommodates_min is not None:
-                query_conditions.append("accommodates >= ?")
-                query_params.append(accommodates_min)
-                
-            if accommodates_max is not None:
-                query_conditions.append("accommodates <= ?")
-                query_params.append(accommodates_max)
-                
-        if 'bedrooms_range' in filters:
-            bedrooms_min, bedrooms_max = filters['bedrooms_range']
-            if bedrooms_min is not None:
-                query_conditions.append("bedrooms >= ?")
-                query_params.append(bedrooms_min)
-                
-            if bedrooms_max is not None:
-                query_conditions.append("bedrooms <= ?")
-                query_params.append(bedrooms_max)
-                
-        if 'beds_range' in filters:
-            beds_min, beds_max = filters['beds_range']
-            if beds_min is not None:
-                query_conditions.append("beds >= ?")
-                query_params.append(beds_min)
-                
-            if beds_max is not None:
-                query_conditions.append("beds <= ?")
-                query_params.append(beds_max)
-                
-        if 'room_type' in filters:
-            room_type = filters['room_type']
-            query_conditions.append("room_type = ?")
-            query_params.append(room_type)
-            
-        if 'property_type' in filters:
-            property_type = filters['property_type']
-            query_conditions.append("property_type = ?")
-            query_params.append(property_type)
-            
-        if 'neighbourhood_cleansed' in filters:
-            neighbourhood = filters['neighbourhood_cleansed']
-            query_conditions.append("neighbourhood_cleansed = ?")
-            query_params.append(neighbourhood)
-            
-        if 'amenities' in filters:
-            amenities = filters['amenities']
-            for amenity in amenities:
-                query_conditions.append("amenities LIKE ?")
-                query_params.append(f"%{amenity}%")
-                
-        if 'host_response_time' in filters:
-            host_response_time = filters['host_response_time']
-            query_conditions.append("host_response_time = ?")
-            query_params.append(host_response_time)
-            
-        if 'superhost' in filters:
-            superhost = filters['superhost']
-            value = 't' if superhost else 'f'
-            query_conditions.append("host_is_superhost = ?")
-            query_params.append(value)
-            
-        if 'review_scores_rating_range' in filters:
-            min_rating, max_rating = filters['review_scores_rating_range']
-            print(f"Debug - Review Rating Filter: min={min_rating}, max={max_rating}")
-            if min_rating is not None:
-                query_conditions.append("COALESCE(review_scores_rating, 0) >= ?")
-                query_params.append(float(min_rating))  # Upewniamy się, że to float
-            if max_rating is not None:
-                query_conditions.append("COALESCE(review_scores_rating, 0) <= ?")
-                query_params.append(float(max_rating))  # Upewniamy się, że to float
-        query = f'''
-            SELECT id, listing_url, name, description, neighborhood_overview,
-                   host_name, host_since, host_location, host_about,
-                   host_response_time, host_response_rate, host_acceptance_rate,
-                   host_is_superhost, host_listings_count, host_identity_verified,
-                   neighbourhood_cleansed, property_type, room_type, accommodates,
-                   bathrooms_text, bedrooms, beds, amenities, price,
-                   minimum_nights, maximum_nights, number_of_reviews,
-                   review_scores_rating, review_scores_accuracy, review_scores_cleanliness,
-                   review_scores_checkin, review_scores_communication,
-                   review_scores_location, review_scores_value,
-                   description_en, neighborhood_overview_en, name_en, host_about_en
-            FROM truncated_listings 
-            WHERE {" AND ".join(query_conditions)}
-        '''
-        print(f"Debug - SQL Query: {query}")
-        print(f"Debug - Query params: {query_params}")
-        cursor.execute(query, query_params)
-        listing = cursor.fetchone()
-        
+        listing = listings.get(result['listing_id'])
         if listing:
-            print(f"Debug - Review scores rating from DB: {listing[27]}")
-            default_image_url = url_for('static', filename='Sicily_photo/Sicily_photo.jpg')
-            
-            def safe_float_convert(value):
-                if value is None:
-                    return None
-                if isinstance(value, (int, float)):
-                    return float(value)
-                if isinstance(value, str) and value.replace('.', '').isdigit():
-                    return float(value)
-                return None
-
-            filtered_results.append({
-                'id': listing[0],
-                'name': listing[36],  # name_en
-                'host_response_time': listing[9],
-                'neighbourhood': listing[15],
-                'property_type': listing[16],
-                'room_type': listing[17],
-                'accommodates': listing[18],
-                'bathrooms': listing[19],
-                'bedrooms': listing[20],
-                'beds': listing[21],
-                'amenities': json.loads(listing[22]),
-                'review_scores_rating': listing[27],
-                'price': f"€{listing[23]} per night",
-                'listing_url': listing[1],
-                'description': listing[34] or "No description",  # description_en
-                'neighborhood_overview': listing[35] or "No neighborhood overview",  # neighborhood_overview_en
-                'host_about': listing[37] or "No host information",  # host_about_en
-                'minimum_nights': listing[24],
-                'maximum_nights': listing[25],
-                'host_name': listing[5],
-                'host_since': listing[6],
-                'host_location': listing[7],
-                'host_response_time': listing[9],
-                'host_response_rate': listing[10],
-                'host_acceptance_rate': listing[11],
-                'host_is_superhost': listing[12],
-                'host_listings_count': listing[13],
-                'host_identity_verified': listing[14],
-                'number_of_reviews': int(listing[26]) if listing[26] is not None else 0,
-                'review_scores_accuracy': listing[28],
-                'review_scores_cleanliness': listing[29],
-                'review_scores_checkin': listing[30],
-                'review_scores_communication': listing[31],
-                'review_scores_location': listing[32],
-                'review_scores_value': listing[33],
-                'picture_url': default_image_url,
-                'similarity_score': similarity_score,
-                'similarity_metrics': result['all_similarities']
-            })
-    conn.close()
+            listing_result = listing_to_dict(listing, fields)
+            listing_result['picture_url'] = default_image_url
+            listing_result['similarity_score'] = result['similarity_score']
+            listing_result['similarity_metrics'] = result['all_similarities']
+            hydrated.append(listing_result)
+    return hydrated
+
+# Serializacja odpowiedzi, zapis czasów etapów do metryk i nagłówka Server-Timing
+def timed_response(payload, timings, cache_status, request_start):
+    stage_start = time.perf_counter()
+    response = jsonify(payload)
+    timings['serialization'] = time.perf_counter() - stage_start
+    for stage, seconds in timings.items():
+        stage_latency.observe(seconds, stage)
+    search_latency.observe(time.perf_counter() - request_start, cache_status)
+    response.headers['Server-Timing'] = ', '.join(
+        [f'{stage};dur={seconds * 1000:.3f}' for stage, seconds in timings.items()] + [f'cache;desc={cache_status}'])
+    return response
+
+# Podpowiedzi słów w polu wyszukiwania (wywoływane przy pisaniu) - bez dostępu do bazy
+@app.route('/suggest')
+def suggest():
+    query = request.args.get('q', '')
+    try:
+        limit = min(max(int(request.args.get('limit', 8)), 1), SUGGEST_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    response = jsonify({'query': query, 'suggestions': search_engine.suggest(query[:200], limit)})
+    # krótkie buforowanie w przeglądarce - te same prefiksy przy poprawianiu tekstu
+    response.headers['Cache-Control'] = 'public, max-age=60'
+    return response
+
+# Pełne dane jednej oferty, pobierane przez przeglądarkę dopiero po rozwinięciu karty
+@app.route('/listing/<int:listing_id>')
+def listing_detail(listing_id):
+    fields = parse_fields(request.args.get('fields'), LISTING_DETAIL_FIELDS)
+    if fields is None:
+        return jsonify({'error': f'fields must be a list of: {", ".join(LISTING_FIELDS)}'}), 400
+    listing = fetch_listings(get_db_connection(), [listing_id], fields).get(listing_id)
+    if listing is None:
+        return jsonify({'error': 'listing not found'}), 404
+    return jsonify(listing_to_dict(listing, fields))
+
+# Oferty podobne do wskazanej - gotowa lista sąsiadów z tabeli i jedno zapytanie po ich dane
+@app.route('/listing/<int:listing_id>/similar')
+def listing_similar(listing_id):
+    if similar_listings is None:
+        return jsonify({'error': 'similar listings have not been computed'}), 503
+    # tabela policzona dla innej zawartości bazy (lub po przebudowie indeksu) - nie zwracamy starych sąsiadów
+    if similar_listings.fingerprint != search_engine.fingerprint:
+        return jsonify({'error': 'similar listings are out of date and need to be recomputed'}), 503
+    fields = parse_fields(request.args.get('fields'), SEARCH_FIELDS)
+    if fields is None:
+        return jsonify({'error': f'fields must be a list of: {", ".join(LISTING_FIELDS)}'}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    neighbours = similar_listings.get(listing_id, limit)
+    if neighbours is None:
+        return jsonify({'error': 'listing not found'}), 404
+    listings = fetch_listings(get_db_connection(), [neighbour for neighbour, _ in neighbours], fields)
+    # oferty usunięte z bazy po policzeniu tabeli są pomijane
+    results = hydrate_results([{'listing_id': neighbour, 'similarity_score': score, 'all_similarities': {'cosine': score}}
+                               for neighbour, score in neighbours], listings, fields)
+    return jsonify({'listing_id': listing_id, 'results': results})
+
+# Dostęp do endpointów administracyjnych tylko z poprawnym nagłówkiem X-Admin-Token
+def admin_authorized():
+    token = app.config['ADMIN_TOKEN']
+    return bool(token) and request.headers.get('X-Admin-Token') == token
+
+# Przyrostowa aktualizacja indeksu po zmianach ofert w bazie:
+# {"ids": [...]} - ponowne wczytanie ofert (brak w bazie = usunięcie), {"compact": true} - pełna przebudowa.
+# Aktualizuje indeks procesu obsługującego żądanie.
+@app.route('/admin/reindex', methods=['POST'])
+def admin_reindex():
+    if not admin_authorized():
+        return jsonify({'error': 'forbidden'}), 403
+    data = request.get_json(silent=True) or {}
+    try:
+        if data.get('ids'):
+            search_engine.upsert_listings(data['ids'])
+        if data.get('compact'):
+            search_engine.compact()
+    except (TypeError, ValueError):
+        return jsonify({'error': 'ids must be a list of listing ids'}), 400
     return jsonify({
-        'total_matches': total_matches,
-        'total_filtered': len(filtered_results),
-        'results': filtered_results
+        'listings': len(search_engine.listing_ids),
+        'pending_changes': search_engine.pending_changes,
+        'fingerprint': search_engine.fingerprint
     })
 
+# Statystyki pamięci podręcznych: wyników /search oraz lematów i zapytań w silniku
+@app.route('/admin/cache-stats')
+def admin_cache_stats():
+    if not admin_authorized():
+        return jsonify({'error': 'forbidden'}), 403
+    return jsonify({'results': result_cache.stats(), 'engine': search_engine.cache_stats()})
+
+# Metryki w formacie tekstowym Prometheusa: histogramy opóźnień oraz liczniki pamięci podręcznych
+@app.route('/metrics')
+def metrics():
+    caches = dict(search_engine.cache_stats(), results=result_cache.stats())
+    lines = metrics_registry.render()
+    lines += render_values('search_cache_hits_total', 'Cache hits', 'counter',
+                           {name: stats['hits'] for name, stats in caches.items()}, 'cache')
+    lines += render_values('search_cache_misses_total', 'Cache misses', 'counter',
+                           {name: stats['misses'] for name, stats in caches.items()}, 'cache')
+    lines += render_values('search_cache_entries', 'Cache entries', 'gauge',
+                           {name: stats['size'] for name, stats in caches.items()}, 'cache')
+    lines += render_values('search_index_listings', 'Listings in the search index', 'gauge',
+                           {None: len(search_engine.listing_ids)})
+    lines += render_values('search_index_pending_changes', 'Incremental changes since the last full build', 'gauge',
+                           {None: search_engine.pending_changes})
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
 # Strona statystyk
 @app.route('/statistics')
 def statistics():
@@ -301,7 +568,6 @@ def statistics():
     total_rows = cursor.fetchone()[0]
     cursor.execute("PRAGMA table_info(truncated_listings)")
     total_columns = len(cursor.fetchall())
-    conn.close()
 
     # Przygotowanie danych do wysłania do szablonu
     data = {
@@ -0,0 +1 @@
+# Benchmarki wyszukiwarki na syntetycznej bazie (generate_db.py, run.py, compare.py)
@@ -0,0 +1,33 @@
+import argparse
+import json
+
+# Porównanie dwóch raportów run.py - wszystkie wartości liczbowe obecne w obu plikach
+def flatten(report, prefix=''):
+    values = {}
+    for key, value in report.items():
+        if key == 'meta':
+            continue
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            values.update(flatten(value, f'{name}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = value
+    return values
+
+def compare(baseline_path, current_path):
+    with open(baseline_path) as f:
+        baseline = flatten(json.load(f))
+    with open(current_path) as f:
+        current = flatten(json.load(f))
+    print(f"{'metric':<50} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name in sorted(baseline.keys() & current.keys()):
+        old, new = baseline[name], current[name]
+        change = f'{(new - old) / old * 100:+.1f}%' if old else 'n/a'
+        print(f'{name:<50} {old:>12.3f} {new:>12.3f} {change:>9}')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare two benchmark reports')
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    args = parser.parse_args()
+    compare(args.baseline, args.current)
@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from price_utils import price_to_cents
+
+# Rozmiary korpusu: obecna baza (27k), oraz docelowe 250k i 1M ofert
+SIZES = {'27k': 27000, '250k': 250000, '1m': 1000000}
+
+# Schemat truncated_listings jak po csv_to_sqlite.py, translate_*.py, process_names.py i clean_data.py
+COLUMNS = [
+    ('id', 'INTEGER'), ('listing_url', 'TEXT'), ('name', 'TEXT'), ('description', 'TEXT'),
+    ('neighborhood_overview', 'TEXT'), ('host_name', 'TEXT'), ('host_since', 'TEXT'),
+    ('host_location', 'TEXT'), ('host_about', 'TEXT'), ('host_response_time', 'TEXT'),
+    ('host_response_rate', 'TEXT'), ('host_acceptance_rate', 'TEXT'), ('host_is_superhost', 'TEXT'),
+    ('host_listings_count', 'REAL'), ('host_identity_verified', 'TEXT'),
+    ('neighbourhood_cleansed', 'TEXT'), ('latitude', 'REAL'), ('longitude', 'REAL'), ('property_type', 'TEXT'), ('room_type', 'TEXT'),
+    ('accommodates', 'INTEGER'), ('bathrooms_text', 'TEXT'), ('bedrooms', 'REAL'), ('beds', 'REAL'),
+    ('amenities', 'TEXT'), ('price', 'TEXT'), ('minimum_nights', 'INTEGER'), ('maximum_nights', 'INTEGER'),
+    ('number_of_reviews', 'INTEGER'), ('review_scores_rating', 'REAL'), ('review_scores_accuracy', 'REAL'),
+    ('review_scores_cleanliness', 'REAL'), ('review_scores_checkin', 'REAL'),
+    ('review_scores_communication', 'REAL'), ('review_scores_location', 'REAL'),
+    ('review_scores_value', 'REAL'), ('description_en', 'TEXT'), ('neighborhood_overview_en', 'TEXT'),
+    ('name_en', 'TEXT'), ('host_about_en', 'TEXT'), ('name_tokens', 'TEXT'), ('price_cents', 'INTEGER')
+]
+
+# Słownictwo nazw ofert - najczęstsze słowa występują na początku listy
+NAME_WORDS = [
+    'apartment', 'house', 'sea', 'view', 'villa', 'room', 'home', 'studio', 'center', 'terrace',
+    'beach', 'pool', 'casa', 'flat', 'holiday', 'loft', 'suite', 'garden', 'charming', 'cozy',
+    'panoramic', 'historic', 'luxury', 'modern', 'family', 'double', 'bedroom', 'balcony', 'old', 'town',
+    'seaside', 'stone', 'farmhouse', 'cottage', 'penthouse', 'private', 'large', 'small', 'bright', 'quiet',
+    'romantic', 'traditional', 'relax', 'sunset', 'etna', 'baroque', 'typical', 'sicilian', 'dimora', 'baglio',
+    'palazzo', 'nest', 'corner', 'blue', 'white', 'lemon', 'olive', 'vineyard', 'country', 'island',
+    'bay', 'harbour', 'cathedral', 'market', 'station', 'airport', 'steps', 'walk', 'minute', 'wifi',
+    'parking', 'jacuzzi', 'spa', 'courtyard', 'rooftop', 'attic', 'b&b', 'guesthouse', 'residence', 'mansion'
+]
+PLACES = [
+    'Palermo', 'Catania', 'Taormina', 'Siracusa', 'Ortigia', 'Cefalù', 'Trapani', 'Marsala', 'Noto', 'Ragusa',
+    'Modica', 'Agrigento', 'Messina', 'Lipari', 'Favignana', 'Scicli', 'Marzamemi', 'Mondello', 'Giardini Naxos',
+    'San Vito lo Capo', 'Castellammare del Golfo', 'Sciacca', 'Erice', 'Milazzo', 'Acireale', 'Pantelleria'
+]
+# Przybliżone współrzędne miejscowości - oferty rozrzucone wokół nich
+PLACE_COORDINATES = {
+    'Palermo': (38.1157, 13.3615), 'Catania': (37.5079, 15.0830), 'Taormina': (37.8526, 15.2876),
+    'Siracusa': (37.0755, 15.2866), 'Ortigia': (37.0599, 15.2936), 'Cefalù': (38.0386, 14.0225),
+    'Trapani': (38.0176, 12.5365), 'Marsala': (37.7987, 12.4344), 'Noto': (36.8906, 15.0697),
+    'Ragusa': (36.9269, 14.7255), 'Modica': (36.8589, 14.7607), 'Agrigento': (37.3111, 13.5765),
+    'Messina': (38.1938, 15.5540), 'Lipari': (38.4674, 14.9540), 'Favignana': (37.9311, 12.3277),
+    'Scicli': (36.7926, 14.7058), 'Marzamemi': (36.7405, 15.1170), 'Mondello': (38.2044, 13.3258),
+    'Giardini Naxos': (37.8277, 15.2687), 'San Vito lo Capo': (38.1736, 12.7355),
+    'Castellammare del Golfo': (38.0262, 12.8806), 'Sciacca': (37.5092, 13.0888), 'Erice': (38.0370, 12.5864),
+    'Milazzo': (38.2208, 15.2419), 'Acireale': (37.6128, 15.1658), 'Pantelleria': (36.8333, 11.9500)
+}
+AMENITIES = [
+    'Wifi', 'Essentials', 'Hair dryer', 'Kitchen', 'Hangers', 'Air conditioning', 'Hot water', 'Dishes and silverware',
+    'Cooking basics', 'Refrigerator', 'Bed linens', 'Iron', 'TV', 'Long term stays allowed', 'Shampoo',
+    'Dedicated workspace', 'Washer', 'Coffee maker', 'Stove', 'Microwave', 'Heating', 'Balcony', 'Oven',
+    'Free street parking', 'Patio or balcony', 'Dining table', 'Extra pillows and blankets', 'Private entrance',
+    'Self check-in', 'Outdoor furniture', 'Smoke alarm', 'First aid kit', 'Fire extinguisher', 'Freezer',
+    'Wine glasses', 'Hot water kettle', 'Room-darkening shades', 'Luggage dropoff allowed', 'Toaster', 'Bathtub',
+    'Free parking on premises', 'Sea view', 'Beach access', 'Pool', 'Private pool', 'BBQ grill', 'Garden view',
+    'Crib', 'High chair', 'Elevator', 'Dishwasher', 'Outdoor dining area', 'Mountain view', 'Lockbox',
+    'Building staff', 'Breakfast', 'Pets allowed', 'Hot tub', 'EV charger', 'Gym', 'Sauna', 'Waterfront'
+]
+PROPERTY_TYPES = [
+    ('Entire rental unit', 'Entire home/apt', 40), ('Entire home', 'Entire home/apt', 15),
+    ('Private room in bed and breakfast', 'Private room', 12), ('Entire condo', 'Entire home/apt', 6),
+    ('Entire villa', 'Entire home/apt', 6), ('Private room in rental unit', 'Private room', 6),
+    ('Entire vacation home', 'Entire home/apt', 4), ('Room in hotel', 'Hotel room', 3),
+    ('Entire loft', 'Entire home/apt', 2), ('Shared room in hostel', 'Shared room', 1)
+]
+RESPONSE_TIMES = ['within an hour', 'within a few hours', 'within a day', 'a few days or more', 'Unknown']
+TEXT_WORDS = [
+    'the', 'a', 'with', 'and', 'of', 'in', 'is', 'to', 'from', 'for', 'located', 'minutes', 'walk', 'sea',
+    'beach', 'center', 'kitchen', 'bedroom', 'bathroom', 'terrace', 'view', 'quiet', 'area', 'restaurants',
+    'shops', 'bars', 'equipped', 'comfortable', 'spacious', 'bright', 'historic', 'building', 'air', 'conditioning',
+    'wifi', 'parking', 'garden', 'pool', 'guests', 'stay', 'perfect', 'couples', 'families', 'relaxing', 'holiday'
+]
+
+# Pseudo-słowa o rzadkiej częstości - słownik rośnie z rozmiarem korpusu jak w prawdziwych danych
+SYLLABLES = ['ca', 'sa', 'ma', 'ri', 'no', 'lo', 'ta', 'vi', 'la', 'be', 'do', 'gi', 'pe', 'ro', 'tu', 'zi']
+
+def rare_words(count, rng):
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(3, 5))))
+    return sorted(words)
+
+def zipf_weights(count, exponent=1.0):
+    return [1.0 / (rank + 1) ** exponent for rank in range(count)]
+
+class ListingGenerator:
+    def __init__(self, rows, seed=0):
+        self.rng = random.Random(seed)
+        # osobny generator współrzędnych - pozostałe kolumny takie same jak w bazach bez współrzędnych
+        self.geo_rng = random.Random(seed + 1)
+        # około jednego rzadkiego słowa na 10 ofert
+        self.vocabulary = NAME_WORDS + [place.lower() for place in PLACES if ' ' not in place] + rare_words(max(rows // 10, 100), self.rng)
+        self.vocabulary_weights = zipf_weights(len(self.vocabulary))
+        self.amenity_weights = zipf_weights(len(AMENITIES), 0.6)
+        self.property_weights = [weight for _, _, weight in PROPERTY_TYPES]
+        self.place_weights = zipf_weights(len(PLACES), 0.8)
+
+    def name(self):
+        words = []
+        for word in self.rng.choices(self.vocabulary, self.vocabulary_weights, k=self.rng.randint(2, 6)):
+            if word not in words:
+                words.append(word)
+        if self.rng.random() < 0.4:
+            words.extend(word for word in self.rng.choices(PLACES, self.place_weights)[0].lower().split() if word not in words)
+        return words
+
+    def text(self, low, high):
+        return ' '.join(self.rng.choices(TEXT_WORDS + NAME_WORDS, k=self.rng.randint(low, high))).capitalize() + '.'
+
+    def amenities(self):
+        count = min(int(self.rng.lognormvariate(3.2, 0.4)), len(AMENITIES))
+        chosen = set()
+        while len(chosen) < count:
+            chosen.update(self.rng.choices(AMENITIES, self.amenity_weights, k=count - len(chosen)))
+        return json.dumps(sorted(chosen, key=AMENITIES.index))
+
+    def price(self):
+        # rozkład log-normalny z długim ogonem, format tekstowy jak po clean_data.py ("1,250.00")
+        return f"{max(int(self.rng.lognormvariate(4.6, 0.7)), 10):,}.00"
+
+    def coordinates(self, place):
+        latitude, longitude = PLACE_COORDINATES[place]
+        return round(self.geo_rng.gauss(latitude, 0.02), 5), round(self.geo_rng.gauss(longitude, 0.02), 5)
+
+    def score(self):
+        return round(min(self.rng.gauss(4.7, 0.25), 5.0), 2)
+
+    def row(self, listing_id):
+        rng = self.rng
+        tokens = self.name()
+        name = ' '.join(word.capitalize() for word in tokens)
+        property_type, room_type, _ = rng.choices(PROPERTY_TYPES, self.property_weights)[0]
+        place = rng.choices(PLACES, self.place_weights)[0]
+        accommodates = rng.choices(range(1, 17), zipf_weights(16, 0.7))[0]
+        price = self.price()
+        reviews = int(rng.expovariate(1 / 40))
+        rated = reviews > 0
+        description = self.text(20, 80)
+        overview = self.text(0, 40) if rng.random() < 0.6 else 'Host did not specify'
+        host_about = self.text(5, 40) if rng.random() < 0.5 else 'No description given'
+        latitude, longitude = self.coordinates(place)
+        # ok. 1% ofert bez przetworzonej nazwy - pomijane przez indeks jak w prawdziwej bazie
+        name_tokens = '|'.join(tokens) if rng.random() > 0.01 else None
+        return (
+            listing_id, f'https://www.airbnb.com/rooms/{listing_id}', name, description, overview,
+            rng.choice(['Giuseppe', 'Maria', 'Salvatore', 'Giovanna', 'Francesco', 'Rosa', 'Antonio', 'Anna']),
+            f'{rng.randint(2010, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}', f'{place}, Italy',
+            host_about, rng.choice(RESPONSE_TIMES), f'{rng.randint(50, 100)}%', f'{rng.randint(40, 100)}%',
+            rng.choice(['t', 'f', 'f']), float(rng.choices([1, 2, 3, 5, 10, 40], [50, 20, 10, 10, 6, 4])[0]),
+            rng.choice(['t', 't', 't', 'f']), place, latitude, longitude, property_type, room_type, accommodates,
+            f'{rng.randint(1, 3)} bath', float(max(accommodates // 2, 1)), float(max(accommodates - 1, 1)),
+            self.amenities(), price, rng.choice([1, 1, 2, 3, 7]), rng.choice([30, 365, 1125]), reviews,
+            self.score() if rated else None, self.score() if rated else None, self.score() if rated else None,
+            self.score() if rated else None, self.score() if rated else None, self.score() if rated else None,
+            self.score() if rated else None, description, overview, name, host_about, name_tokens,
+            price_to_cents(price)
+        )
+
+# Utworzenie syntetycznej bazy z tabelą truncated_listings, wstawianie partiami
+def generate_db(db_path, rows, seed=0, batch_size=10000):
+    start_time = time.time()
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    generator = ListingGenerator(rows, seed)
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"CREATE TABLE truncated_listings ({', '.join(f'{name} {kind}' for name, kind in COLUMNS)})")
+    insert = f"INSERT INTO truncated_listings VALUES ({', '.join('?' * len(COLUMNS))})"
+    for start in range(0, rows, batch_size):
+        conn.executemany(insert, (generator.row(1000000 + i) for i in range(start, min(start + batch_size, rows))))
+        conn.commit()
+    # te same indeksy co clean_data.py
+    for column in ['price_cents', 'room_type', 'property_type', 'neighbourhood_cleansed', 'accommodates', 'review_scores_rating']:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_truncated_listings_{column} ON truncated_listings({column})")
+    conn.execute('ANALYZE')
+    conn.commit()
+    conn.close()
+    print(f"Generated {rows} listings in {db_path} in {time.time() - start_time:.1f}s")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic truncated_listings database')
+    parser.add_argument('--size', default='27k', help=f"number of listings or one of: {', '.join(SIZES)}")
+    parser.add_argument('--out', default=None, help='database path (default: benchmarks/data/synthetic_<size>.db)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rows = SIZES.get(args.size.lower()) or int(args.size)
+    out = args.out or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', f'synthetic_{args.size.lower()}.db')
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    generate_db(out, rows, args.seed)
@@ -0,0 +1,233 @@
+import argparse
+import gc
+import importlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import sklearn
+from search_engine import SearchEngine, SearchIndex, SIMILARITY_MEASURES, fetch_index_rows, listings_fingerprint
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Zapytania testowe: częste i rzadkie słowa, nazwy miejsc, słowa spoza słownika
+QUERIES = [
+    'sea view apartment', 'villa with pool', 'cozy studio in the center', 'taormina', 'ortigia terrace',
+    'charming historic house near the beach', 'luxury penthouse with jacuzzi', 'family home garden parking',
+    'romantic loft', 'baroque palazzo noto', 'quiet farmhouse etna vineyard', 'xyzzy'
+]
+
+# Filtry testowe w formacie /search (cena, goście, udogodnienia, kategoria)
+FILTERS = {
+    'price_range': [50, 300],
+    'accommodates_range': [2, None],
+    'amenities': ['Wifi', 'Air conditioning'],
+    'room_type': 'Entire home/apt'
+}
+
+# Filtr przestrzenny: 2 km od Ortigii
+NEAR_FILTERS = {'near': {'lat': 37.0599, 'lon': 15.2936, 'radius_km': 2}}
+
+def latency_stats(samples):
+    samples = sorted(samples)
+    return {
+        'count': len(samples),
+        'mean_ms': statistics.fmean(samples) * 1000,
+        'p50_ms': samples[len(samples) // 2] * 1000,
+        'p95_ms': samples[min(int(len(samples) * 0.95), len(samples) - 1)] * 1000,
+        'max_ms': samples[-1] * 1000
+    }
+
+def timed(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def max_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux podaje KB, macOS bajty
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+# Budowa indeksu: odczyt z bazy, uczenie TF-IDF, zapis i wczytanie z dysku, pamięć
+def bench_build(db_path, index_path):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    listings = fetch_index_rows(db_path)
+    fetch_time = time.perf_counter() - start
+    fingerprint = listings_fingerprint(listings)
+    start = time.perf_counter()
+    index = SearchIndex.build(listings, fingerprint)
+    build_time = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    index.save(index_path)
+    save_time = time.perf_counter() - start
+    index_bytes = sum(array.nbytes for array in index._arrays().values())
+    disk_bytes = sum(entry.stat().st_size for entry in os.scandir(index_path))
+    del listings, index
+    gc.collect()
+
+    start = time.perf_counter()
+    SearchEngine(db_path, index_path=index_path)
+    verified_start = time.perf_counter() - start
+    start = time.perf_counter()
+    engine = SearchEngine(db_path, index_path=index_path, verify_index=False)
+    shared_start = time.perf_counter() - start
+    return engine, {
+        'fetch_rows_s': fetch_time,
+        'build_s': build_time,
+        'save_s': save_time,
+        'startup_verified_s': verified_start,
+        'startup_shared_s': shared_start,
+        'build_peak_traced_mb': peak / (1024 * 1024),
+        'index_arrays_mb': index_bytes / (1024 * 1024),
+        'index_disk_mb': disk_bytes / (1024 * 1024),
+        'listings': len(engine.listing_ids),
+        'terms': len(engine.terms)
+    }
+
+# Opóźnienie pojedynczego zapytania silnika dla każdej miary, bez filtrów i z filtrami
+def bench_queries(engine, repeat):
+    results = {}
+    for measure in SIMILARITY_MEASURES:
+        for label, filters in (('plain', None), ('filtered', FILTERS), ('near', NEAR_FILTERS)):
+            samples = []
+            for query in QUERIES:
+                engine.search(query, top_k=20, filters=filters, similarity_measure=measure)
+                samples.extend(timed(lambda: engine.search(query, top_k=20, filters=filters,
+                                                           similarity_measure=measure), repeat))
+            results[f'{measure}_{label}'] = latency_stats(samples)
+    return results
+
+# Wsadowe search_many (wszystkie zapytania testowe powtórzone do 120) - czas przeliczony na jedno zapytanie
+def bench_batch(engine, repeat):
+    queries = (QUERIES * 10)[:120]
+    results = {}
+    for measure in SIMILARITY_MEASURES:
+        engine.search_many(queries, top_k=20, similarity_measure=measure)
+        samples = timed(lambda: engine.search_many(queries, top_k=20, similarity_measure=measure), max(repeat // 5, 1))
+        results[measure] = dict(latency_stats(samples), per_query_ms=statistics.fmean(samples) * 1000 / len(queries))
+    return results
+
+# Podpowiedzi słów dla kolejnych prefiksów zapytań testowych, jak przy pisaniu znak po znaku
+def bench_suggest(engine, repeat):
+    start = time.perf_counter()
+    engine.index.suggester()
+    build_time = time.perf_counter() - start
+    prefixes = [query[:end] for query in QUERIES for end in range(1, len(query) + 1)]
+    samples = []
+    for prefix in prefixes:
+        samples.extend(timed(lambda: engine.suggest(prefix, 8), repeat))
+    return dict(latency_stats(samples), build_ms=build_time * 1000)
+
+# /search przez klienta testowego Flask: analiza, ranking, odczyt ofert z bazy i serializacja JSON
+def load_app(db_path, index_path):
+    os.environ['AIRBNB_DB'] = db_path
+    os.environ['SEARCH_INDEX'] = index_path
+    # bez pamięci podręcznej wyników - mierzymy pełną ścieżkę zapytania
+    os.environ['RESULT_CACHE_SIZE'] = '0'
+    previous_dir = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        if 'app' in sys.modules:
+            return importlib.reload(sys.modules['app'])
+        return importlib.import_module('app')
+    finally:
+        os.chdir(previous_dir)
+
+def bench_endpoint(app_module, repeat):
+    client = app_module.app.test_client()
+    results = {}
+    for label, body in (('compact', {}), ('filtered', {'filters': FILTERS}),
+                        ('all_fields', {'fields': list(app_module.LISTING_FIELDS)})):
+        samples = []
+        sizes = []
+        for query in QUERIES:
+            request = dict(body, query=query)
+            client.post('/search', json=request)
+            for _ in range(repeat):
+                start = time.perf_counter()
+                response = client.post('/search', json=request)
+                samples.append(time.perf_counter() - start)
+            sizes.append(len(response.data))
+        results[label] = dict(latency_stats(samples), mean_response_bytes=statistics.fmean(sizes))
+    return results
+
+def bench_filter_options(app_module, repeat):
+    return latency_stats(timed(app_module.get_filter_options, repeat))
+
+def run(db_path, repeat, skip_endpoint=False):
+    index_path = tempfile.mkdtemp(prefix='search_index_')
+    try:
+        engine, build = bench_build(db_path, index_path)
+        report = {
+            'meta': {
+                'database': os.path.abspath(db_path),
+                'database_mb': os.path.getsize(db_path) / (1024 * 1024),
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'sklearn': sklearn.__version__,
+                'platform': platform.platform(),
+                'repeat': repeat
+            },
+            'build': build,
+            'queries': bench_queries(engine, repeat),
+            'batch_queries': bench_batch(engine, repeat),
+            'suggest': bench_suggest(engine, repeat)
+        }
+        del engine
+        gc.collect()
+        if not skip_endpoint:
+            app_module = load_app(db_path, index_path)
+            report['search_endpoint'] = bench_endpoint(app_module, repeat)
+            report['filter_options'] = bench_filter_options(app_module, max(repeat // 5, 1))
+        report['meta']['max_rss_mb'] = max_rss_mb()
+        return report
+    finally:
+        shutil.rmtree(index_path, ignore_errors=True)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the search engine on a (synthetic) listings database')
+    parser.add_argument('--db', required=True, help='database generated by benchmarks/generate_db.py')
+    parser.add_argument('--out', default=None, help='JSON report path (default: print only)')
+    parser.add_argument('--repeat', type=int, default=20, help='measurements per query')
+    parser.add_argument('--skip-endpoint', action='store_true', help='only engine benchmarks, without Flask')
+    args = parser.parse_args()
+    report = run(args.db, args.repeat, args.skip_endpoint)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text)
+        print(f"Report saved to {args.out}")
+    print(text)
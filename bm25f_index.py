@@ -0,0 +1,189 @@
+import functools
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# analizator jak w TfidfVectorizer (małe litery, słowa z co najmniej 2 znaków)
+ANALYZER = TfidfVectorizer(lowercase=True).build_analyzer()
+
+# pola indeksu: waga pola i współczynnik b normalizacji długości
+# processed - teksty już po lematyzacji (name_tokens z process_names.py)
+BM25F_FIELDS = {
+    'name': {'weight': 3.0, 'b': 0.5, 'processed': True},
+    'description': {'weight': 1.0, 'b': 0.75},
+    'neighborhood': {'weight': 0.6, 'b': 0.75},
+    'host': {'weight': 0.2, 'b': 0.75}
+}
+BM25F_K1 = 1.2
+
+# teksty wstawiane przez clean_data.py w miejsce braków - nie są treścią oferty
+PLACEHOLDER_TEXTS = {'Host did not specify', 'No description given', 'No description', 'NA'}
+
+# Analiza tekstów jednego pola: słowa -> lematy (jak w zapytaniach) -> numery termów.
+# Wynik w postaci CSR (indptr, indices) bez sumowania powtórzeń.
+def analyze_field(texts, vocabulary, lemmatize, stop_words, frozen=False):
+    # lemmatize=None - słowa przyjmowane bez zmian (pole już przetworzone)
+    # token_ids - cache słowo -> numer termu (-1 dla stop words i, przy frozen, słów spoza słownika)
+    token_ids = {}
+    ids = []
+    indptr = [0]
+    for text in texts:
+        if text and text not in PLACEHOLDER_TEXTS:
+            for token in ANALYZER(text):
+                term_id = token_ids.get(token)
+                if term_id is None:
+                    if token in stop_words:
+                        lemma = None
+                    else:
+                        lemma = lemmatize(token) if lemmatize else token
+                    if lemma is None or (frozen and lemma not in vocabulary):
+                        term_id = -1
+                    else:
+                        term_id = vocabulary.setdefault(lemma, len(vocabulary))
+                    token_ids[token] = term_id
+                if term_id >= 0:
+                    ids.append(term_id)
+        indptr.append(len(ids))
+    return np.array(indptr, dtype=np.int64), np.array(ids, dtype=np.int64)
+
+# Suma (dodatnich) wartości dla powtarzających się numerów ofert: (oferty rosnąco, sumy); kolejność sumowania
+# jak na wejściu. Listy postingowe są posortowane, więc sortowanie stabilne (timsort) ich połączenia jest
+# prawie liniowe; gdy list jest tyle co ofert, tańsze jest zliczanie na pełnym zakresie - koszt nadal O(długość list)
+def sum_by_row(rows, values, documents):
+    if len(rows) * 4 >= documents:
+        sums = np.bincount(rows, weights=values, minlength=documents)
+        rows = np.flatnonzero(sums)
+        return rows, sums[rows]
+    order = np.argsort(rows, kind='stable')
+    rows = rows[order]
+    first = np.empty(len(rows), dtype=bool)
+    first[:1] = True
+    np.not_equal(rows[1:], rows[:-1], out=first[1:])
+    return rows[first], np.bincount(np.cumsum(first) - 1, weights=values[order], minlength=int(first.sum()))
+
+# Indeks wielopolowy BM25F: dla każdego pola macierz CSC oferty x termy z liczbą wystąpień (uint8)
+# i długości pól ofert; wagi pól podawane przy zapytaniu, bez przebudowy indeksu
+class BM25FIndex:
+    def __init__(self, terms, idf, fields, lengths):
+        # posortowany słownik termów wszystkich pól i wagi idf (df liczone po ofertach)
+        self.terms = terms
+        self.idf = idf
+        self.fields = fields
+        self.lengths = lengths
+        self.documents = len(next(iter(lengths.values())))
+        self.avg_lengths = {name: float(values.mean()) if len(values) and values.mean() > 0 else 1.0
+                            for name, values in lengths.items()}
+
+    @staticmethod
+    def _field_matrix(indptr, ids, shape):
+        # zliczenie powtórzeń termów w ofercie; liczby wystąpień obcięte do 255 (i tak nasycane przez k1)
+        matrix = sp.csr_matrix((np.ones(len(ids), dtype=np.int32), ids, indptr), shape=shape)
+        matrix.sum_duplicates()
+        matrix = matrix.tocsc()
+        return sp.csc_matrix((np.minimum(matrix.data, 255).astype(np.uint8), matrix.indices.astype(np.int32),
+                              matrix.indptr.astype(np.int64)), shape=shape)
+
+    @staticmethod
+    def _analyze(field_texts, vocabulary, lemmatize, stop_words, frozen=False):
+        analyzed = {}
+        for name, texts in field_texts.items():
+            if BM25F_FIELDS[name].get('processed'):
+                analyzed[name] = analyze_field(texts, vocabulary, None, (), frozen)
+            else:
+                analyzed[name] = analyze_field(texts, vocabulary, lemmatize, stop_words, frozen)
+        return analyzed
+
+    @classmethod
+    def build(cls, field_texts, lemmatize, stop_words):
+        # field_texts - nazwa pola (BM25F_FIELDS) -> lista tekstów w kolejności ofert
+        vocabulary = {}
+        analyzed = cls._analyze(field_texts, vocabulary, lemmatize, stop_words)
+        # numeracja termów zgodna z posortowaną tablicą terms (wyszukiwanie binarne w transform)
+        terms = np.array(sorted(vocabulary), dtype=str)
+        order = np.empty(len(vocabulary), dtype=np.int64)
+        order[[vocabulary[term] for term in terms.tolist()]] = np.arange(len(terms))
+        fields = {}
+        lengths = {}
+        for name, (indptr, ids) in analyzed.items():
+            shape = (len(indptr) - 1, len(terms))
+            fields[name] = cls._field_matrix(indptr, order[ids], shape)
+            lengths[name] = np.diff(indptr).astype(np.uint32)
+        # df - liczba ofert z termem w którymkolwiek polu
+        union = functools.reduce(lambda a, b: a + b, [(matrix != 0).astype(np.int8) for matrix in fields.values()])
+        df = np.diff(union.tocsc().indptr)
+        documents = union.shape[0]
+        idf = np.log(1.0 + (documents - df + 0.5) / (df + 0.5))
+        return cls(terms, idf, fields, lengths)
+
+    def append(self, field_texts, lemmatize, stop_words):
+        # nowy indeks z dopisanymi ofertami; termy spoza słownika i idf czekają na pełną przebudowę
+        vocabulary = {term: i for i, term in enumerate(self.terms.tolist())}
+        fields = {}
+        lengths = {}
+        for name, (indptr, ids) in self._analyze(field_texts, vocabulary, lemmatize, stop_words, frozen=True).items():
+            new_matrix = self._field_matrix(indptr, ids, (len(indptr) - 1, len(self.terms)))
+            fields[name] = sp.vstack([self.fields[name], new_matrix], format='csc')
+            fields[name].indices = fields[name].indices.astype(np.int32)
+            lengths[name] = np.concatenate([self.lengths[name], np.diff(indptr).astype(np.uint32)])
+        return BM25FIndex(self.terms, self.idf, fields, lengths)
+
+    def arrays(self):
+        arrays = {'bm25f_terms': self.terms, 'bm25f_idf': self.idf}
+        for name, matrix in self.fields.items():
+            arrays[f'bm25f_{name}_data'] = matrix.data
+            arrays[f'bm25f_{name}_indices'] = matrix.indices
+            arrays[f'bm25f_{name}_indptr'] = matrix.indptr
+            arrays[f'bm25f_{name}_lengths'] = self.lengths[name]
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, load, documents):
+        # load - funkcja nazwa -> tablica (np. mapowana z dysku)
+        terms = load('bm25f_terms')
+        shape = (documents, len(terms))
+        fields = {name: sp.csc_matrix((load(f'bm25f_{name}_data'), load(f'bm25f_{name}_indices'),
+                                       load(f'bm25f_{name}_indptr')), shape=shape)
+                  for name in BM25F_FIELDS}
+        lengths = {name: load(f'bm25f_{name}_lengths') for name in BM25F_FIELDS}
+        return cls(terms, load('bm25f_idf'), fields, lengths)
+
+    def transform(self, text):
+        # numery termów zapytania i liczba ich wystąpień; słowa spoza słownika pomijane
+        tokens = np.array(ANALYZER(text), dtype=str)
+        positions = np.searchsorted(self.terms, tokens) if len(tokens) else np.empty(0, dtype=np.int64)
+        known = positions < len(self.terms)
+        known[known] = self.terms[positions[known]] == tokens[known]
+        return np.unique(positions[known], return_counts=True)
+
+    def score(self, term_ids, counts, weights=None):
+        # BM25F: ważona suma znormalizowanych wystąpień termu w polach, nasycana raz na term (k1);
+        # koszt proporcjonalny do długości list postingowych termów zapytania (tablice rozmiaru korpusu
+        # tylko wtedy, gdy listy są porównywalnej długości).
+        # Wynik: (oferty rosnąco, punkty)
+        weights = weights or {name: field['weight'] for name, field in BM25F_FIELDS.items()}
+        term_rows = []
+        term_scores = []
+        for term, count in zip(term_ids, counts):
+            rows = []
+            contributions = []
+            for name, matrix in self.fields.items():
+                weight = weights.get(name, 0.0)
+                if not weight:
+                    continue
+                b = BM25F_FIELDS[name]['b']
+                start, end = matrix.indptr[term], matrix.indptr[term + 1]
+                field_rows = matrix.indices[start:end]
+                rows.append(field_rows)
+                contributions.append(weight * matrix.data[start:end] / (1.0 - b + b * self.lengths[name][field_rows] / self.avg_lengths[name]))
+            if not rows:
+                continue
+            # suma po polach dla ofert z listy postingowej któregokolwiek pola
+            documents, tf = sum_by_row(np.concatenate(rows), np.concatenate(contributions), self.documents)
+            term_rows.append(documents)
+            term_scores.append(self.idf[term] * count * tf * (BM25F_K1 + 1.0) / (tf + BM25F_K1))
+        if not term_rows:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        # suma punktów termów dla sumy zbiorów kandydatów
+        candidates, scores = sum_by_row(np.concatenate(term_rows), np.concatenate(term_scores), self.documents)
+        keep = scores > 0
+        return candidates[keep].astype(np.int64), scores[keep]
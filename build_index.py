@@ -0,0 +1,24 @@
+import argparse
+import time
+from search_engine import SearchIndex, fetch_index_rows, listings_fingerprint
+
+# Zbudowanie indeksu wyszukiwania i zapisanie go na dysk dla szybkiego startu aplikacji
+def build_index(db_path='airbnb.db', index_path='search_index', only_if_stale=False):
+    start_time = time.time()
+    listings = fetch_index_rows(db_path)
+    fingerprint = listings_fingerprint(listings)
+    if only_if_stale and SearchIndex.load(index_path, fingerprint):
+        print(f"Index in {index_path} is up to date")
+        return
+    index = SearchIndex.build(listings, fingerprint)
+    index.save(index_path)
+    print(f"Index with {len(index.listing_ids)} listings saved to {index_path} in {time.time() - start_time:.1f}s")
+    print(f"Fingerprint: {fingerprint}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the on-disk search index')
+    parser.add_argument('--db', default='airbnb.db')
+    parser.add_argument('--out', default='search_index')
+    parser.add_argument('--if-stale', action='store_true', help='rebuild only when the database has changed')
+    args = parser.parse_args()
+    build_index(args.db, args.out, args.if_stale)
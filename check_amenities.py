@@ -1,17 +1,10 @@
-import sqlite3
-import json
+from amenity_index import AmenityIndex
 
 #Sprawdzenie najpopularniejszych udogodnien
 def check_amenities():
-    #Polaczenie do bazy
-    conn = sqlite3.connect('airbnb.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT amenities FROM truncated_listings WHERE amenities IS NOT NULL')
-    all_amenities = {}
-    for row in cursor.fetchall():
-        amenities = json.loads(row[0])
-        for amenity in amenities:
-            all_amenities[amenity] = all_amenities.get(amenity, 0) + 1
+    #Indeks udogodnien zbudowany z bazy
+    index = AmenityIndex.from_db('airbnb.db')
+    all_amenities = index.counts()
     
     # sortowanie
     sorted_amenities = sorted(all_amenities.items(), key=lambda x: x[1], reverse=True)
@@ -20,7 +13,5 @@ def check_amenities():
     print("\nTop 20 most common amenities and their frequencies:")
     for amenity, count in sorted_amenities[:20]:
         print(f"{amenity}: {count} listings")
-    #zamykanie połączenia
-    conn.close()
 if __name__ == "__main__":
-    check_amenities()
\ No newline at end of file
+    check_amenities()
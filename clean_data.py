@@ -1,4 +1,5 @@
 import sqlite3
+from price_utils import price_to_cents
 
 #Polaczenie do bazy danych
 conn = sqlite3.connect('airbnb.db')
@@ -15,6 +16,22 @@ cursor.execute("UPDATE truncated_listings SET price = REPLACE(price, '$', '')")
 
 conn.commit()
 
+#Migracja: liczbowa kolumna price_cents, wspólne parsowanie ceny z silnikiem wyszukiwania
+cursor.execute("PRAGMA table_info(truncated_listings)")
+if 'price_cents' not in [col[1] for col in cursor.fetchall()]:
+    cursor.execute("ALTER TABLE truncated_listings ADD COLUMN price_cents INTEGER")
+conn.create_function('price_to_cents', 1, price_to_cents, deterministic=True)
+cursor.execute("UPDATE truncated_listings SET price_cents = price_to_cents(price)")
+
+#Indeksy na filtrowanych kolumnach i statystyki dla planera zapytań
+for column in ['price_cents', 'room_type', 'property_type', 'neighbourhood_cleansed', 'accommodates', 'review_scores_rating']:
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_truncated_listings_{column} ON truncated_listings({column})")
+conn.commit()
+cursor.execute("ANALYZE")
+conn.commit()
+#Tryb WAL - czytelnicy aplikacji nie blokują się nawzajem ani z zapisem
+cursor.execute("PRAGMA journal_mode=WAL")
+
 #Weryfikacja
 cursor.execute("SELECT COUNT(*) FROM truncated_listings WHERE neighborhood_overview = 'Host did not specify'")
 neighborhood_updates = cursor.fetchone()[0]
@@ -1,8 +1,6 @@
 import subprocess
 scripts = [
-    'csv_to_sqlite.py', #wybór kolumn i zamiana na SQLite
-    'truncate_and_filter.py', #ograniczenie liczby rekordów
-    'clean_data.py', #czyszczenie danych
+    'ingest_listings.py', #wczytanie CSV paczkami: wybór kolumn, czyszczenie, limit rekordów, price_cents i indeksy
     'check_tables.py' #weryfikacja tabel
 ]
 
@@ -8,7 +8,7 @@ selected_columns = [
     'host_name', 'host_since', 'host_location', 'host_about',
     'host_response_time', 'host_response_rate', 'host_acceptance_rate',
     'host_is_superhost', 'host_listings_count', 'host_identity_verified',
-    'neighbourhood_cleansed', 'property_type',
+    'neighbourhood_cleansed', 'latitude', 'longitude', 'property_type',
     'room_type', 'accommodates', 'bathrooms_text', 'bedrooms', 'beds',
     'amenities', 'price', 'minimum_nights', 'maximum_nights',
     'number_of_reviews', 'review_scores_rating', 'review_scores_accuracy',
@@ -0,0 +1,61 @@
+import numpy as np
+
+# Bok komórki siatki w stopniach (ok. 1 km szerokości geograficznej)
+CELL_SIZE = 0.01
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * np.pi / 180
+
+# Odległość po okręgu wielkim w km (wzór haversine), wektorowo dla tablic współrzędnych
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    lat1, lon1 = np.radians(latitude), np.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+# Indeks przestrzenny: oferty posortowane po numerze komórki siatki (wiersz szerokości * szerokość siatki + kolumna).
+# Komórki jednego pasa szerokości geograficznej w prostokącie to ciągły zakres numerów - wyszukiwanie binarne
+# zamiast sprawdzania wszystkich ofert; oferty bez współrzędnych nie trafiają do indeksu
+class GeoIndex:
+    def __init__(self, latitudes, longitudes, cell_size=CELL_SIZE):
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.cell_size = cell_size
+        self.width = int(np.ceil(360 / cell_size)) + 1
+        located = np.flatnonzero(~np.isnan(latitudes) & ~np.isnan(longitudes))
+        keys = self._cell(latitudes[located]) * self.width + self._cell(np.asarray(longitudes[located]) + 180)
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.rows = located[order]
+
+    def _cell(self, degrees):
+        return np.floor(np.asarray(degrees, dtype=np.float64) / self.cell_size).astype(np.int64)
+
+    def bbox(self, south, west, north, east):
+        # numery wierszy ofert w prostokącie (granice włącznie), rosnąco
+        if not np.isfinite([south, west, north, east]).all() or south > north or west > east or not len(self.rows):
+            return np.empty(0, dtype=np.int64)
+        lat_cells = np.arange(self._cell(max(south, -90.0)), self._cell(min(north, 90.0)) + 1)
+        west_cell, east_cell = self._cell(max(west, -180.0) + 180), self._cell(min(east, 180.0) + 180)
+        starts = np.searchsorted(self.keys, lat_cells * self.width + west_cell, side='left')
+        ends = np.searchsorted(self.keys, lat_cells * self.width + east_cell, side='right')
+        if not len(starts):
+            # prostokąt poza zakresem współrzędnych (np. w całości na północ od 90 stopni)
+            return np.empty(0, dtype=np.int64)
+        rows = np.concatenate([self.rows[start:end] for start, end in zip(starts, ends)])
+        # komórki brzegowe wystają poza prostokąt - dokładne sprawdzenie współrzędnych
+        latitudes, longitudes = self.latitudes[rows], self.longitudes[rows]
+        inside = (latitudes >= south) & (latitudes <= north) & (longitudes >= west) & (longitudes <= east)
+        return np.sort(rows[inside])
+
+    def radius(self, latitude, longitude, radius_km):
+        # oferty w odległości co najwyżej radius_km: prostokąt opisany na okręgu, potem dokładna odległość
+        lat_delta = radius_km / KM_PER_DEGREE
+        lon_delta = min(radius_km / (KM_PER_DEGREE * max(np.cos(np.radians(latitude)), 1e-6)), 180.0)
+        rows = self.bbox(latitude - lat_delta, longitude - lon_delta, latitude + lat_delta, longitude + lon_delta)
+        distances = haversine_km(latitude, longitude, self.latitudes[rows], self.longitudes[rows])
+        return rows[distances <= radius_km]
+
+    def mask(self, rows):
+        mask = np.zeros(len(self.latitudes), dtype=bool)
+        mask[rows] = True
+        return mask
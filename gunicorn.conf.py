@@ -0,0 +1,16 @@
+import os
+import multiprocessing
+from build_index import build_index
+
+# Uruchomienie: gunicorn -c gunicorn.conf.py
+# Proces nadrzędny buduje indeks raz, a workery mapują te same pliki z dysku (bez kopii w RAM)
+wsgi_app = 'app:app'
+bind = os.environ.get('BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+
+def on_starting(server):
+    build_index(os.environ.get('AIRBNB_DB', 'airbnb.db'),
+                os.environ.get('SEARCH_INDEX', 'search_index'),
+                only_if_stale=True)
+    # workery dziedziczą zmienną i przyjmują świeżo sprawdzony indeks bez ponownego liczenia odcisku
+    os.environ['SEARCH_INDEX_SHARED'] = '1'
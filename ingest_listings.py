@@ -0,0 +1,78 @@
+import argparse
+import sqlite3
+import time
+import pandas as pd
+from price_utils import price_to_cents
+
+# Kolumny wczytywane z listings.csv (Inside Airbnb) i ich typy - bez zgadywania typów przez pandas
+COLUMN_TYPES = {
+    'id': 'Int64', 'listing_url': 'object', 'name': 'object', 'description': 'object',
+    'neighborhood_overview': 'object', 'host_name': 'object', 'host_since': 'object',
+    'host_location': 'object', 'host_about': 'object', 'host_response_time': 'object',
+    'host_response_rate': 'object', 'host_acceptance_rate': 'object', 'host_is_superhost': 'object',
+    'host_listings_count': 'float64', 'host_identity_verified': 'object', 'neighbourhood_cleansed': 'object',
+    'latitude': 'float64', 'longitude': 'float64', 'property_type': 'object', 'room_type': 'object',
+    'accommodates': 'Int64', 'bathrooms_text': 'object', 'bedrooms': 'float64', 'beds': 'float64',
+    'amenities': 'object', 'price': 'object', 'minimum_nights': 'Int64', 'maximum_nights': 'Int64',
+    'number_of_reviews': 'Int64', 'review_scores_rating': 'float64', 'review_scores_accuracy': 'float64',
+    'review_scores_cleanliness': 'float64', 'review_scores_checkin': 'float64',
+    'review_scores_communication': 'float64', 'review_scores_location': 'float64',
+    'review_scores_value': 'float64'
+}
+SQL_TYPES = {'Int64': 'INTEGER', 'float64': 'REAL', 'object': 'TEXT'}
+
+# Indeksy na filtrowanych kolumnach (jak w clean_data.py) i na id ofert
+INDEXED_COLUMNS = ['id', 'price_cents', 'room_type', 'property_type', 'neighbourhood_cleansed', 'accommodates',
+                   'review_scores_rating']
+
+# Reguły czyszczenia z clean_data.py zastosowane do jednej paczki wierszy
+def clean_listings(chunk):
+    chunk = chunk.copy()
+    overview = chunk['neighborhood_overview']
+    chunk['neighborhood_overview'] = overview.where(overview.notna() & (overview != 'NA'), 'Host did not specify')
+    chunk['host_response_time'] = chunk['host_response_time'].replace('N/A', 'Unknown')
+    host_about = chunk['host_about']
+    chunk['host_about'] = host_about.where(host_about.notna() & ~host_about.isin(['', '.']), 'No description given')
+    chunk['price'] = chunk['price'].str.replace('$', '', regex=False)
+    chunk['price_cents'] = chunk['price'].map(price_to_cents, na_action='ignore').astype('Int64')
+    return chunk
+
+# Jedno przejście po CSV: paczki wierszy -> czyszczenie -> limit wierszy -> zapis do truncated_listings,
+# każda paczka w jednej transakcji; pamięć ograniczona rozmiarem paczki, a nie całym plikiem
+def ingest_listings(csv_path='listings.csv', db_path='airbnb.db', limit=27000, chunk_size=10000):
+    start_time = time.time()
+    conn = sqlite3.connect(db_path)
+    conn.execute('DROP TABLE IF EXISTS listings')
+    conn.execute('DROP TABLE IF EXISTS truncated_listings')
+    columns = [f'{name} {SQL_TYPES[kind]}' for name, kind in COLUMN_TYPES.items()] + ['price_cents INTEGER']
+    conn.execute(f"CREATE TABLE truncated_listings ({', '.join(columns)})")
+    conn.commit()
+
+    rows = 0
+    with pd.read_csv(csv_path, usecols=list(COLUMN_TYPES), dtype=COLUMN_TYPES, chunksize=chunk_size) as reader:
+        for chunk in reader:
+            if limit is not None:
+                chunk = chunk.iloc[:limit - rows]
+            clean_listings(chunk).to_sql('truncated_listings', conn, if_exists='append', index=False)
+            rows += len(chunk)
+            # reszta pliku nie jest czytana po osiągnięciu limitu
+            if limit is not None and rows >= limit:
+                break
+
+    for column in INDEXED_COLUMNS:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_truncated_listings_{column} ON truncated_listings({column})")
+    conn.execute('ANALYZE')
+    conn.commit()
+    # Tryb WAL - czytelnicy aplikacji nie blokują się nawzajem ani z zapisem
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.close()
+    print(f"Ingested {rows} listings from {csv_path} into {db_path} in {time.time() - start_time:.1f}s")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load, clean and truncate listings.csv into truncated_listings')
+    parser.add_argument('--csv', default='listings.csv')
+    parser.add_argument('--db', default='airbnb.db')
+    parser.add_argument('--limit', type=int, default=27000, help='maximum number of listings (0 - no limit)')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='rows read and inserted per transaction')
+    args = parser.parse_args()
+    ingest_listings(args.csv, args.db, args.limit or None, args.chunk_size)
@@ -0,0 +1,91 @@
+import threading
+
+# Proste metryki w formacie tekstowym Prometheusa (bez zewnętrznych zależności).
+# Wartości są per proces - przy kilku workerach gunicorn każdy ma własne liczniki.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+class Counter:
+    def __init__(self, name, help_text, label_name=None):
+        self.name = name
+        self.help_text = help_text
+        self.label_name = label_name
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label=None, amount=1):
+        with self._lock:
+            self._values[label] = self._values.get(label, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label, value in sorted(self._values.items(), key=lambda item: str(item[0])):
+                labels = [(self.label_name, label)] if self.label_name else []
+                lines.append(f'{self.name}{format_labels(labels)} {value}')
+        return lines
+
+class Histogram:
+    def __init__(self, name, help_text, label_name=None, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_name = label_name
+        self.buckets = tuple(buckets)
+        # etykieta -> [liczniki kubełków, suma, liczba obserwacji]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, label=None):
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label, (counts, total, count) in sorted(self._series.items(), key=lambda item: str(item[0])):
+                labels = [(self.label_name, label)] if self.label_name else []
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{format_labels(labels + [("le", bound)])} {bucket_count}')
+                lines.append(f'{self.name}_bucket{format_labels(labels + [("le", "+Inf")])} {count}')
+                lines.append(f'{self.name}_sum{format_labels(labels)} {total}')
+                lines.append(f'{self.name}_count{format_labels(labels)} {count}')
+        return lines
+
+# Wartości liczone poza rejestrem (np. statystyki pamięci podręcznych) - jedna linia na serię
+def render_values(name, help_text, metric_type, values, label_name=None):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}']
+    for label, value in values.items():
+        labels = [(label_name, label)] if label_name else []
+        lines.append(f'{name}{format_labels(labels)} {value}')
+    return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, help_text, label_name=None):
+        metric = Counter(name, help_text, label_name)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, label_name=None, buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, label_name, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return lines
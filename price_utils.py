@@ -0,0 +1,19 @@
+import math
+
+# Cena zapisana jako tekst, np. "1,200.00", "$85.00" lub "€85.00" -> liczba; brak lub błąd -> NaN
+def parse_price(value):
+    if value is None:
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace('$', '').replace('€', '').replace(',', '').strip())
+    except ValueError:
+        return math.nan
+
+# Cena w centach jako liczba całkowita (kolumna price_cents); brak lub błąd -> None
+def price_to_cents(value):
+    price = parse_price(value)
+    if math.isnan(price):
+        return None
+    return int(round(price * 100))
@@ -1,5 +1,20 @@
 import sqlite3
+import os
+import json
+import logging
+import re
+import hashlib
+import functools
+import threading
+import time
 import numpy as np
+import scipy.sparse as sp
+from amenity_index import AmenityIndex
+from bm25f_index import BM25FIndex
+from geo_index import GeoIndex
+from price_utils import parse_price
+from term_corrector import TermCorrector
+from term_suggester import TermSuggester
 from sklearn.feature_extraction.text import TfidfVectorizer
 import nltk
 from nltk.tokenize import word_tokenize
@@ -7,6 +22,8 @@ from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
 from nltk.corpus import wordnet
 
+logger = logging.getLogger(__name__)
+
 # pobranie paczek nltk
 try:
     nltk.data.find('tokenizers/punkt')
@@ -19,106 +36,721 @@ except LookupError:
     nltk.download('wordnet')
     nltk.download('averaged_perceptron_tagger')
 
+# wersja formatu zapisanego indeksu - zmiana wymusza przebudowę
+INDEX_FORMAT_VERSION = 7
+
+# miary nazw (TF-IDF) oraz BM25F po nazwie, opisie, okolicy i opisie gospodarza
+SIMILARITY_MEASURES = ['cosine', 'jaccard', 'dice', 'bm25f']
+
+# kolumny tekstowe indeksowane przez BM25F (pole 'name' to name_tokens)
+TEXT_COLUMNS = {
+    'description': 'description_en',
+    'neighborhood': 'neighborhood_overview_en',
+    'host': 'host_about_en'
+}
+
+# kolumny ofert ładowane do tablic NumPy na potrzeby filtrów
+NUMERIC_COLUMNS = ['price', 'accommodates', 'bedrooms', 'beds', 'review_scores_rating', 'number_of_reviews',
+                   'latitude', 'longitude']
+CATEGORICAL_COLUMNS = ['room_type', 'property_type', 'neighbourhood_cleansed', 'host_response_time']
+RANGE_FILTERS = {
+    'price_range': 'price',
+    'accommodates_range': 'accommodates',
+    'bedrooms_range': 'bedrooms',
+    'beds_range': 'beds'
+}
+
+# analizator tekstu identyczny z TfidfVectorizer użytym przy budowie indeksu
+ANALYZER = TfidfVectorizer(lowercase=True).build_analyzer()
+
+def tag_to_wordnet(tag):
+    tag_dict = {
+        "J": wordnet.ADJ,
+        "N": wordnet.NOUN,
+        "V": wordnet.VERB,
+        "R": wordnet.ADV
+    }
+    return tag_dict.get(tag[0].upper(), wordnet.NOUN)
+
+# lematyzacja słowa z cache LRU; bez podanego tagu część mowy ustala pos_tag
+def make_lemmatizer(cache_size=None):
+    lemmatizer = WordNetLemmatizer()
+
+    def lemmatize(token, tag=None):
+        if tag is None:
+            tag = nltk.pos_tag([token])[0][1]
+        return lemmatizer.lemmatize(token, tag_to_wordnet(tag))
+    return functools.lru_cache(maxsize=cache_size)(lemmatize)
+
+# odcisk zawartości truncated_listings, z której budowany jest indeks
+def listings_fingerprint(listings):
+    digest = hashlib.sha256(str(INDEX_FORMAT_VERSION).encode())
+    for row in listings:
+        digest.update('\x1f'.join(str(value) for value in row).encode('utf-8'))
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+# wiersze ofert do indeksu; listing_ids ogranicza odczyt do wskazanych ofert
+def fetch_index_rows(db_path, listing_ids=None):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    # kolumn brakujących w starszych bazach (np. współrzędnych) nie ma - odczytywane jako NULL
+    available = {row[1] for row in cursor.execute('PRAGMA table_info(truncated_listings)')}
+    columns = ', '.join(column if column in available else f'NULL AS {column}'
+                        for column in NUMERIC_COLUMNS + CATEGORICAL_COLUMNS + ['host_is_superhost', 'amenities'])
+    query = f'''
+        SELECT id, name_tokens, name_en, {', '.join(TEXT_COLUMNS.values())}, {columns}
+        FROM truncated_listings
+        WHERE name_tokens IS NOT NULL
+    '''
+    if listing_ids is None:
+        cursor.execute(query + ' ORDER BY rowid')
+        listings = cursor.fetchall()
+    else:
+        listing_ids = list(listing_ids)
+        listings = []
+        # paczki po 500 id - limit parametrów SQLite
+        for start in range(0, len(listing_ids), 500):
+            chunk = listing_ids[start:start + 500]
+            cursor.execute(query + f' AND id IN ({", ".join("?" * len(chunk))}) ORDER BY rowid', chunk)
+            listings.extend(cursor.fetchall())
+    conn.close()
+    return listings
+
+# Lista napisów spakowana w jeden bufor UTF-8 z offsetami - daje się mapować z dysku
+# i współdzielić między procesami, w przeciwieństwie do listy obiektów Pythona
+class PackedStrings:
+    def __init__(self, blob, offsets, nulls):
+        self.blob = blob
+        self.offsets = offsets
+        self.nulls = nulls
+
+    @classmethod
+    def from_list(cls, values):
+        encoded = [(value or '').encode('utf-8') for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(value) for value in encoded])
+        blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        nulls = np.array([value is None for value in values], dtype=bool)
+        return cls(blob, offsets, nulls)
+
+    def append(self, values):
+        other = PackedStrings.from_list(values)
+        return PackedStrings(np.concatenate([self.blob, other.blob]),
+                             np.concatenate([self.offsets, other.offsets[1:] + self.offsets[-1]]),
+                             np.concatenate([self.nulls, other.nulls]))
+
+    def __len__(self):
+        return len(self.nulls)
+
+    def __getitem__(self, i):
+        if self.nulls[i]:
+            return None
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+# Niezmienny po zbudowaniu stan indeksu - współdzielony przez wszystkie zapytania bez blokad
+class SearchIndex:
+    def __init__(self, fingerprint, terms, idf, tfidf_matrix, postings, doc_sq_norms,
+                 listing_ids, original_names, attributes, categories, amenity_index, bm25f, corrector,
+                 alive=None, pending_changes=0):
+        self.fingerprint = fingerprint
+        # posortowany słownik termów (kolejność kolumn TfidfVectorizer) i wagi idf
+        self.terms = terms
+        self.idf = idf
+        self.tfidf_matrix = tfidf_matrix
+        # indeks odwrócony: kolumna termu w CSC to lista ofert, w których występuje
+        self.postings = postings
+        # kwadraty norm dokumentów liczone raz, potrzebne do wszystkich miar
+        self.doc_sq_norms = doc_sq_norms
+        self.listing_ids = listing_ids
+        self.original_names = original_names
+        self.attributes = attributes
+        self.categories = categories
+        self.amenity_index = amenity_index
+        # indeks wielopolowy dla miary bm25f
+        self.bm25f = bm25f
+        # słownik usunięć do poprawiania literówek w słowach zapytań spoza słownika
+        self.corrector = corrector
+        # oferty usunięte lub zastąpione nowszą wersją od ostatniej pełnej budowy (None - brak)
+        self.alive = alive
+        # liczba zmian dopisanych przyrostowo od ostatniej pełnej budowy
+        self.pending_changes = pending_changes
+        # podpowiedzi słów budowane przy pierwszym użyciu (nie spowalniają wczytania indeksu)
+        self._frequencies = None
+        self._suggester = None
+        self._geo_index = None
+        self._correct_term = functools.lru_cache(maxsize=10000)(self._correct_term_uncached)
+        for array in self._arrays().values():
+            array.flags.writeable = False
+        if alive is not None:
+            alive.flags.writeable = False
+
+    @classmethod
+    def build(cls, listings, fingerprint):
+        listing_ids = []
+        processed_names = []
+        original_names = []
+        text_rows = []
+        attribute_rows = []
+
+        for listing_id, tokens, original_name, *columns in listings:
+            if tokens:
+                listing_ids.append(listing_id)
+                processed_names.append(tokens.replace('|', ' '))
+                original_names.append(original_name)
+                text_rows.append(columns[:len(TEXT_COLUMNS)])
+                attribute_rows.append(columns[len(TEXT_COLUMNS):])
+
+        vectorizer = TfidfVectorizer(lowercase=True, norm=None)
+        tfidf_matrix = vectorizer.fit_transform(processed_names)
+        doc_sq_norms = np.asarray(tfidf_matrix.multiply(tfidf_matrix).sum(axis=1)).ravel()
+        attributes, categories, amenity_rows = cls._build_attributes(attribute_rows, {})
+        amenity_index = AmenityIndex.from_json_rows(amenity_rows)
+        terms = np.array(vectorizer.get_feature_names_out().tolist(), dtype=str)
+        bm25f = BM25FIndex.build(cls._field_texts(processed_names, text_rows), make_lemmatizer(),
+                                 set(stopwords.words('english')))
+        return cls(fingerprint, terms, vectorizer.idf_, tfidf_matrix, tfidf_matrix.tocsc(), doc_sq_norms,
+                   np.array(listing_ids, dtype=np.int64), PackedStrings.from_list(original_names),
+                   attributes, categories, amenity_index, bm25f, TermCorrector.build(terms))
+
+    @staticmethod
+    def _field_texts(processed_names, text_rows):
+        # teksty pól BM25F w kolejności ofert
+        columns = list(zip(*text_rows)) or [()] * len(TEXT_COLUMNS)
+        field_texts = {'name': processed_names}
+        field_texts.update(zip(TEXT_COLUMNS, columns))
+        return field_texts
+
+    @staticmethod
+    def _build_attributes(attribute_rows, categories):
+        # categories - dotychczasowe kategorie; nowe wartości dopisywane na końcu, stare kody bez zmian
+        columns = list(zip(*attribute_rows)) or [()] * (len(NUMERIC_COLUMNS) + len(CATEGORICAL_COLUMNS) + 2)
+        attributes = {}
+        categories = {name: list(values) for name, values in categories.items()}
+        # kolumny liczbowe jako float64, brak wartości -> NaN; cena parsowana raz
+        for name, values in zip(NUMERIC_COLUMNS, columns):
+            convert = parse_price if name == 'price' else (lambda v: np.nan if v is None else float(v))
+            attributes[name] = np.array([convert(v) for v in values], dtype=np.float64)
+        # kolumny kategoryczne jako kody do posortowanej listy kategorii, brak wartości -> -1
+        for name, values in zip(CATEGORICAL_COLUMNS, columns[len(NUMERIC_COLUMNS):]):
+            names = categories.setdefault(name, [])
+            names.extend(sorted({v for v in values if v is not None} - set(names)))
+            codes = {category: i for i, category in enumerate(names)}
+            attributes[name] = np.array([codes.get(v, -1) for v in values], dtype=np.int32)
+        superhost = {'t': 1, 'f': 0}
+        attributes['host_is_superhost'] = np.array([superhost.get(v, -1) for v in columns[-2]], dtype=np.int8)
+        return attributes, categories, columns[-1]
+
+    def with_changes(self, listings, deleted_ids=()):
+        # nowy indeks z dopisanymi/zmienionymi ofertami (listings) i usuniętymi deleted_ids;
+        # nowe wiersze ważone bieżącym idf, nieznane termy czekają na kompakcję (pełną przebudowę)
+        listings = [row for row in listings if row[1]]
+        changed_ids = np.array([row[0] for row in listings] + list(deleted_ids), dtype=np.int64)
+        alive = np.ones(len(self.listing_ids), dtype=bool) if self.alive is None else self.alive.copy()
+        replaced = np.isin(self.listing_ids, changed_ids) & alive
+        alive[replaced] = False
+        pending_changes = self.pending_changes + int(replaced.sum()) + len(listings)
+        if not listings:
+            return SearchIndex(self.fingerprint, self.terms, self.idf, self.tfidf_matrix, self.postings,
+                               self.doc_sq_norms, self.listing_ids, self.original_names, self.attributes,
+                               self.categories, self.amenity_index, self.bm25f, self.corrector, alive,
+                               pending_changes)
+
+        new_matrix = sp.vstack([self.transform(row[1].replace('|', ' ')) for row in listings], format='csr')
+        tfidf_matrix = sp.vstack([self.tfidf_matrix, new_matrix], format='csr')
+        new_sq_norms = np.asarray(new_matrix.multiply(new_matrix).sum(axis=1)).ravel()
+        attribute_start = 3 + len(TEXT_COLUMNS)
+        attributes, categories, amenity_rows = self._build_attributes([row[attribute_start:] for row in listings],
+                                                                      self.categories)
+        bm25f = self.bm25f.append(self._field_texts([row[1].replace('|', ' ') for row in listings],
+                                                    [row[3:attribute_start] for row in listings]),
+                                  make_lemmatizer(), set(stopwords.words('english')))
+        return SearchIndex(
+            self.fingerprint, self.terms, self.idf, tfidf_matrix, tfidf_matrix.tocsc(),
+            np.concatenate([self.doc_sq_norms, new_sq_norms]),
+            np.concatenate([self.listing_ids, np.array([row[0] for row in listings], dtype=np.int64)]),
+            self.original_names.append([row[2] for row in listings]),
+            {name: np.concatenate([values, attributes[name]]) for name, values in self.attributes.items()},
+            categories, self.amenity_index.append(amenity_rows), bm25f, self.corrector,
+            np.concatenate([alive, np.ones(len(listings), dtype=bool)]), pending_changes)
+
+    def _arrays(self):
+        arrays = {
+            'terms': self.terms,
+            'idf': self.idf,
+            'data': self.tfidf_matrix.data,
+            'indices': self.tfidf_matrix.indices,
+            'indptr': self.tfidf_matrix.indptr,
+            'postings_data': self.postings.data,
+            'postings_indices': self.postings.indices,
+            'postings_indptr': self.postings.indptr,
+            'doc_sq_norms': self.doc_sq_norms,
+            'listing_ids': self.listing_ids,
+            'names_blob': self.original_names.blob,
+            'names_offsets': self.original_names.offsets,
+            'names_nulls': self.original_names.nulls,
+            'amenity_bits': self.amenity_index.bits,
+        }
+        arrays.update(self.bm25f.arrays())
+        arrays.update(self.corrector.arrays())
+        for name, values in self.attributes.items():
+            arrays[f'attr_{name}'] = values
+        return arrays
+
+    def save(self, index_path):
+        if self.pending_changes:
+            raise ValueError("Index has incremental changes, compact it before saving")
+        os.makedirs(index_path, exist_ok=True)
+        # zapis do pliku tymczasowego i podmiana - procesy mapujące stary plik zachowują jego kopię
+        for name, array in self._arrays().items():
+            path = os.path.join(index_path, f'{name}.npy')
+            with open(path + '.tmp', 'wb') as f:
+                np.save(f, array)
+            os.replace(path + '.tmp', path)
+        # meta.json zapisywany na końcu - bez niego indeks jest traktowany jako nieaktualny
+        meta_path = os.path.join(index_path, 'meta.json')
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({
+                'format_version': INDEX_FORMAT_VERSION,
+                'fingerprint': self.fingerprint,
+                'shape': list(self.tfidf_matrix.shape),
+                'categories': self.categories,
+                'amenities': self.amenity_index.names
+            }, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    @classmethod
+    def load(cls, index_path, fingerprint=None):
+        # None, gdy indeksu brak albo nie odpowiada zawartości bazy;
+        # fingerprint=None ufa indeksowi (np. zbudowanemu właśnie przez proces nadrzędny)
+        meta_path = os.path.join(index_path, 'meta.json')
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('format_version') != INDEX_FORMAT_VERSION or fingerprint not in (None, meta.get('fingerprint')):
+            logger.warning("Index in %s is stale, rebuilding in memory", index_path)
+            return None
+
+        # tablice mapowane z dysku - współdzielone przez procesy przez page cache
+        def load(name):
+            return np.load(os.path.join(index_path, f'{name}.npy'), mmap_mode='r')
+
+        shape = tuple(meta['shape'])
+        original_names = PackedStrings(load('names_blob'), load('names_offsets'), load('names_nulls'))
+        attributes = {name: load(f'attr_{name}')
+                      for name in NUMERIC_COLUMNS + CATEGORICAL_COLUMNS + ['host_is_superhost']}
+        return cls(meta['fingerprint'], load('terms'), load('idf'),
+                   sp.csr_matrix((load('data'), load('indices'), load('indptr')), shape=shape),
+                   sp.csc_matrix((load('postings_data'), load('postings_indices'), load('postings_indptr')), shape=shape),
+                   load('doc_sq_norms'), load('listing_ids'), original_names, attributes, meta['categories'],
+                   AmenityIndex(meta['amenities'], load('amenity_bits')), BM25FIndex.from_arrays(load, shape[0]),
+                   TermCorrector.from_arrays(load))
+
+    def filter_mask(self, filters):
+        # maska ofert spełniających filtry strukturalne; None gdy brak filtrów
+        if not filters:
+            return None
+        masks = []
+        for key, column in RANGE_FILTERS.items():
+            if key in filters:
+                low, high = filters[key]
+                values = self.attributes[column]
+                if low is not None:
+                    masks.append(values >= float(low))
+                if high is not None:
+                    masks.append(values <= float(high))
+        if filters.get('min_reviews') is not None:
+            masks.append(self.attributes['number_of_reviews'] >= float(filters['min_reviews']))
+        if 'review_scores_rating_range' in filters:
+            low, high = filters['review_scores_rating_range']
+            # oferty bez oceny traktowane jak ocena 0
+            ratings = np.nan_to_num(self.attributes['review_scores_rating'], nan=0.0)
+            if low is not None:
+                masks.append(ratings >= float(low))
+            if high is not None:
+                masks.append(ratings <= float(high))
+        for column in CATEGORICAL_COLUMNS:
+            if column in filters:
+                categories = self.categories[column]
+                code = categories.index(filters[column]) if filters[column] in categories else -2
+                masks.append(self.attributes[column] == code)
+        if 'superhost' in filters:
+            masks.append(self.attributes['host_is_superhost'] == (1 if filters['superhost'] else 0))
+        if filters.get('amenities'):
+            masks.append(self.amenity_index.mask(filters['amenities']))
+        # filtry przestrzenne: prostokąt [południe, zachód, północ, wschód] i okrąg {lat, lon, radius_km}
+        if filters.get('bbox'):
+            south, west, north, east = (float(value) for value in filters['bbox'])
+            masks.append(self.geo_index().mask(self.geo_index().bbox(south, west, north, east)))
+        if filters.get('near'):
+            near = filters['near']
+            masks.append(self.geo_index().mask(self.geo_index().radius(float(near['lat']), float(near['lon']),
+                                                                       float(near['radius_km']))))
+        if not masks:
+            return None
+        return np.logical_and.reduce(masks)
+
+    def transform(self, text):
+        # wektor tf-idf zapytania jak TfidfVectorizer.transform (norm=None), termy szukane
+        # binarnie w posortowanej tablicy zamiast w słowniku Pythona
+        tokens = np.array(ANALYZER(text), dtype=str)
+        positions = np.searchsorted(self.terms, tokens) if len(tokens) else np.empty(0, dtype=np.int64)
+        known = positions < len(self.terms)
+        known[known] = self.terms[positions[known]] == tokens[known]
+        term_ids, counts = np.unique(positions[known], return_counts=True)
+        return sp.csr_matrix((counts * self.idf[term_ids], term_ids, [0, len(term_ids)]),
+                             shape=(1, self.tfidf_matrix.shape[1]))
+
+    def candidates(self, query_vector):
+        # suma list postingowych termów zapytania - tylko te oferty mają niezerowy iloczyn
+        indptr, indices = self.postings.indptr, self.postings.indices
+        postings = [indices[indptr[term]:indptr[term + 1]] for term in query_vector.indices]
+        if not postings:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.unique(np.concatenate(postings))
+        if self.alive is not None:
+            candidates = candidates[self.alive[candidates]]
+        return candidates
+
+    def term_frequencies(self):
+        # liczba (aktualnych) ofert z termem w nazwie - długość listy postingowej termu
+        if self._frequencies is None:
+            indptr = self.postings.indptr
+            if self.alive is None:
+                self._frequencies = np.diff(indptr)
+            else:
+                alive_postings = np.concatenate([[0], np.cumsum(self.alive[self.postings.indices])])
+                self._frequencies = alive_postings[indptr[1:]] - alive_postings[indptr[:-1]]
+        return self._frequencies
+
+    def geo_index(self):
+        if self._geo_index is None:
+            self._geo_index = GeoIndex(self.attributes['latitude'], self.attributes['longitude'])
+        return self._geo_index
+
+    def suggester(self):
+        if self._suggester is None:
+            self._suggester = TermSuggester(self.terms, self.term_frequencies())
+        return self._suggester
+
+    def _correct_term_uncached(self, token):
+        return self.corrector.correct(token, self.terms, self.term_frequencies())
+
+    def correct_query(self, text, known_terms=None):
+        # słowa spoza słownika nazw (i spoza known_terms, np. słownika BM25F) zastąpione najbliższym termem;
+        # wynik: (poprawiony tekst, słowo -> poprawka)
+        corrections = {}
+        for token in set(text.split()):
+            if contains_term(self.terms, token) or (known_terms is not None and contains_term(known_terms, token)):
+                continue
+            corrected = self._correct_term(token)
+            if corrected:
+                corrections[token] = corrected
+        if not corrections:
+            return text, corrections
+        return " ".join(corrections.get(token, token) for token in text.split()), corrections
+
+    def bm25f_scores(self, text, weights=None):
+        # oferty z co najmniej jednym termem zapytania w którymkolwiek polu i ich punkty BM25F
+        candidates, scores = self.bm25f.score(*self.bm25f.transform(text), weights)
+        if self.alive is not None:
+            keep = self.alive[candidates]
+            candidates, scores = candidates[keep], scores[keep]
+        return candidates, np.round(scores, 4)
+
+    def transform_many(self, texts):
+        # macierz zapytań (wiersz na zapytanie) złożona z wektorów transform bez vstack wielu macierzy
+        vectors = [self.transform(text) for text in texts]
+        indptr = np.zeros(len(vectors) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([vector.nnz for vector in vectors])
+        indices = np.concatenate([vector.indices for vector in vectors]) if vectors else np.empty(0, dtype=np.int32)
+        data = np.concatenate([vector.data for vector in vectors]) if vectors else np.empty(0)
+        return sp.csr_matrix((data, indices, indptr), shape=(len(vectors), self.tfidf_matrix.shape[1]))
+
+    def calculate_similarities(self, query_vector, rows=None):
+        # jeden iloczyn macierz-wektor zamiast porównywania dokumentów po kolei
+        matrix = self.tfidf_matrix if rows is None else self.tfidf_matrix[rows]
+        dot_product = np.asarray(matrix.dot(query_vector.T).todense()).ravel()
+        q_magnitude = query_vector.multiply(query_vector).sum()
+        d_magnitude = self.doc_sq_norms if rows is None else self.doc_sq_norms[rows]
+        return self.similarity_measures(dot_product, q_magnitude, d_magnitude)
+
+    def calculate_similarities_many(self, query_matrix):
+        # wszystkie zapytania jednym iloczynem macierzy rzadkich: zapytania x (indeks odwrócony)^T;
+        # niezerowe elementy wiersza to kandydaci zapytania. Wynik: lista (kandydaci, miary) na zapytanie
+        dot_products = query_matrix.dot(self.postings.T).tocsr()
+        dot_products.sort_indices()
+        q_magnitudes = np.asarray(query_matrix.multiply(query_matrix).sum(axis=1)).ravel()
+        scored = []
+        for i in range(query_matrix.shape[0]):
+            start, end = dot_products.indptr[i], dot_products.indptr[i + 1]
+            candidates = dot_products.indices[start:end].astype(np.int64)
+            dot_product = dot_products.data[start:end]
+            if self.alive is not None:
+                keep = self.alive[candidates]
+                candidates, dot_product = candidates[keep], dot_product[keep]
+            scored.append((candidates, self.similarity_measures(dot_product, q_magnitudes[i],
+                                                                 self.doc_sq_norms[candidates])))
+        return scored
+
+    @staticmethod
+    def similarity_measures(dot_product, q_magnitude, d_magnitude):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # miara cosinusa
+            mianownik_cosine = np.sqrt(q_magnitude) * np.sqrt(d_magnitude)
+            cosine = np.where(mianownik_cosine > 0, dot_product / mianownik_cosine, 0.0)
+
+            # DICE
+            mianownik_dice = q_magnitude + d_magnitude
+            dice = np.where(mianownik_dice > 0, (2.0 * dot_product) / mianownik_dice, 0.0)
+
+            # Jaccard
+            mianownik_jaccard = q_magnitude + d_magnitude - dot_product
+            jaccard = np.where(mianownik_jaccard > 0, dot_product / mianownik_jaccard, 0.0)
+
+        return {
+            'dice': np.round(dice, 4),
+            'jaccard': np.round(jaccard, 4),
+            'cosine': np.round(cosine, 4)
+        }
+
+def contains_term(terms, token):
+    # wyszukiwanie binarne w posortowanej tablicy termów
+    position = np.searchsorted(terms, token)
+    return position < len(terms) and terms[position] == token
+
+def _index_property(name):
+    return property(lambda self: getattr(self.index, name))
+
 class SearchEngine:
-    def __init__(self, db_path='airbnb.db', similarity_measure='cosine'):
+    # stan korpusu czytany z bieżącego, niezmiennego SearchIndex
+    fingerprint = _index_property('fingerprint')
+    terms = _index_property('terms')
+    tfidf_matrix = _index_property('tfidf_matrix')
+    listing_ids = _index_property('listing_ids')
+    original_names = _index_property('original_names')
+    attributes = _index_property('attributes')
+    categories = _index_property('categories')
+    amenity_index = _index_property('amenity_index')
+    pending_changes = _index_property('pending_changes')
+
+    def __init__(self, db_path='airbnb.db', similarity_measure='cosine', index_path=None,
+                 lemma_cache_size=50000, query_cache_size=10000, tag_whole_query=False,
+                 verify_index=True, compaction_ratio=0.1, field_weights=None, correct_typos=True):
         self.db_path = db_path
-        self.vectorizer = None
-        self.listing_ids = []
-        self.processed_names = []
-        self.original_names = []
+        self.index_path = index_path
+        # False - indeks z index_path przyjmowany bez sprawdzania odcisku bazy (tryb współdzielony)
+        self.verify_index = verify_index
+        # kompakcja (pełna przebudowa), gdy zmiany przyrostowe przekroczą ten ułamek ofert
+        self.compaction_ratio = compaction_ratio
+        # zapisujący są serializowani; czytający nie blokują - podmiana self.index jest atomowa
+        self._update_lock = threading.Lock()
+        self.index = None
+        # domyślna miara; zapytania mogą podać własną bez zmiany stanu silnika
         self.similarity_measure = similarity_measure
-        self.lemmatizer = WordNetLemmatizer()
+        # wagi pól BM25F (domyślnie z BM25F_FIELDS), stosowane przy zapytaniu
+        self.field_weights = field_weights
+        # poprawianie literówek w słowach zapytania spoza słownika przed liczeniem podobieństw
+        self.correct_typos = correct_typos
         self.stop_words = set(stopwords.words('english'))
+        # korpusy NLTK wczytywane leniwie (LazyCorpusLoader) nie są bezpieczne wątkowo przy pierwszym użyciu -
+        # wczytanie przed pierwszymi równoległymi zapytaniami, także gdy indeks jest mapowany z dysku
+        wordnet.ensure_loaded()
+        word_tokenize('warm up')
+        # tagowanie całego zapytania jednym wywołaniem pos_tag zamiast słowo po słowie
+        self.tag_whole_query = tag_whole_query
+        # ograniczone cache LRU: token -> lemat oraz zapytanie -> przetworzony tekst
+        self._lemmatize = make_lemmatizer(lemma_cache_size)
+        self._process_query = functools.lru_cache(maxsize=query_cache_size)(self._process_query_uncached)
         self._initialize()
-    
-    def _get_wordnet_pos(self, word):
-        tag = nltk.pos_tag([word])[0][1][0].upper()
-        tag_dict = {
-            "J": wordnet.ADJ,
-            "N": wordnet.NOUN,
-            "V": wordnet.VERB,
-            "R": wordnet.ADV
-        }
-        return tag_dict.get(tag, wordnet.NOUN)
-    
+
+    def _process_query_uncached(self, text):
+        tokens = word_tokenize(text)
+        tokens = [token for token in tokens if token.isalnum() and token not in self.stop_words]
+        if self.tag_whole_query:
+            processed = [self._lemmatize(token, tag[:1]) for token, tag in nltk.pos_tag(tokens)]
+        else:
+            processed = [self._lemmatize(token) for token in tokens]
+        return " ".join(processed)
+
     def process_text(self, text):
         if not text:
             return ""
-        tokens = word_tokenize(text.lower())
-        tokens = [token for token in tokens if token.isalnum() and token not in self.stop_words]
-        processed = [self.lemmatizer.lemmatize(token, self._get_wordnet_pos(token)) for token in tokens]
-        return " ".join(processed)
-    
+        return self._process_query(text.lower())
+
+    def suggest(self, text, limit=None):
+        # podpowiedzi dla ostatniego, niedokończonego słowa zapytania; wcześniejsze słowa bez zmian
+        match = re.search(r'\w+$', text or '')
+        if not match:
+            return []
+        head = text[:match.start()]
+        return [{'text': head + term, 'term': term, 'listings': listings}
+                for term, listings in self.index.suggester().suggest(match.group().lower(), limit)]
+
+    def cache_stats(self):
+        stats = {}
+        for name, cache in (('lemma', self._lemmatize), ('query', self._process_query)):
+            info = cache.cache_info()
+            stats[name] = {'hits': info.hits, 'misses': info.misses,
+                           'size': info.currsize, 'maxsize': info.maxsize}
+        return stats
+
     def _initialize(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT id, name_tokens, name_en 
-            FROM truncated_listings 
-            WHERE name_tokens IS NOT NULL
-        ''')
-        listings = cursor.fetchall()
-        conn.close()
-        
-        self.listing_ids = []
-        self.processed_names = []
-        self.original_names = []
-        
-        for listing_id, tokens, original_name in listings:
-            if tokens:
-                self.listing_ids.append(listing_id)
-                self.processed_names.append(tokens.replace('|', ' '))
-                self.original_names.append(original_name)
-        
-        self.vectorizer = TfidfVectorizer(lowercase=True, norm=None)
-        self.tfidf_matrix = self.vectorizer.fit_transform(self.processed_names)
-
-    def calculate_similarities(self, query_vector, doc_vector):
-        q = query_vector.toarray().flatten()
-        d = doc_vector.toarray().flatten()
-        
-        dot_product = np.sum(q * d)
-        q_magnitude = np.sum(q * q)
-        d_magnitude = np.sum(d * d)
-        
-        # maiara cosinusa
-        mianownik_cosine = np.sqrt(q_magnitude) * np.sqrt(d_magnitude)
-        cosine = dot_product / mianownik_cosine if mianownik_cosine > 0 else 0
-        
-        #DICE
-        mianownik_dice = q_magnitude + d_magnitude
-        dice = (2.0 * dot_product) / mianownik_dice if mianownik_dice > 0 else 0
-        
-        # Jaccard
-        mianownik_jaccard = q_magnitude + d_magnitude - dot_product
-        jaccard = dot_product / mianownik_jaccard if mianownik_jaccard > 0 else 0
-        
-        return {
-            'dice': round(dice, 4),
-            'jaccard': round(jaccard, 4),
-            'cosine': round(cosine, 4)
-        }
+        if self.index_path and not self.verify_index:
+            self.index = SearchIndex.load(self.index_path)
+            if self.index:
+                return
+        listings = fetch_index_rows(self.db_path)
+        fingerprint = listings_fingerprint(listings)
+        # aktualny indeks z dysku - pomijamy ponowne uczenie TfidfVectorizer
+        index = SearchIndex.load(self.index_path, fingerprint) if self.index_path else None
+        self.index = index or SearchIndex.build(listings, fingerprint)
+
+    def upsert_listings(self, listing_ids):
+        # ponowne wczytanie wskazanych ofert z bazy; brak oferty (lub name_tokens) oznacza usunięcie
+        listing_ids = [int(listing_id) for listing_id in listing_ids]
+        with self._update_lock:
+            # odczyt pod blokadą - równoległe wywołania nie nadpiszą nowszego stanu ofert starszym
+            listings = fetch_index_rows(self.db_path, listing_ids)
+            found = {row[0] for row in listings if row[1]}
+            self.index = self.index.with_changes(listings, [i for i in listing_ids if i not in found])
+            self._compact_if_needed()
+
+    def delete_listings(self, listing_ids):
+        with self._update_lock:
+            self.index = self.index.with_changes([], [int(listing_id) for listing_id in listing_ids])
+            self._compact_if_needed()
+
+    def compact(self):
+        with self._update_lock:
+            self._rebuild()
+
+    def _compact_if_needed(self):
+        if self.index.pending_changes > self.compaction_ratio * max(len(self.index.listing_ids), 1):
+            self._rebuild()
+
+    def _rebuild(self):
+        # pełne przeliczenie z bazy: nowe termy w słowniku, aktualne idf, bez usuniętych wierszy
+        listings = fetch_index_rows(self.db_path)
+        self.index = SearchIndex.build(listings, listings_fingerprint(listings))
+
+    def save_index(self, index_path=None):
+        self.index.save(index_path or self.index_path)
+
+    def filter_mask(self, filters):
+        return self.index.filter_mask(filters)
+
+    def calculate_similarities(self, query_vector, rows=None):
+        return self.index.calculate_similarities(query_vector, rows)
+
+    @staticmethod
+    def _top_positions(scores, k):
+        # częściowa selekcja k najlepszych; remisy w kolejności ofert jak przy stabilnym sortowaniu
+        if k >= len(scores):
+            selected = np.arange(len(scores))
+        elif k <= 0:
+            return np.empty(0, dtype=np.int64)
+        else:
+            threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+            above = np.flatnonzero(scores > threshold)
+            ties = np.flatnonzero(scores == threshold)[:k - len(above)]
+            selected = np.sort(np.concatenate([above, ties]))
+        return selected[np.argsort(-scores[selected], kind='stable')]
+
+    def search(self, query, top_k=20, offset=0, filters=None, similarity_measure=None, timings=None):
+        similarity_measure = similarity_measure or self.similarity_measure
+        if similarity_measure not in SIMILARITY_MEASURES:
+            raise ValueError(f"Unknown similarity measure: {similarity_measure}")
+        # jedno odczytanie referencji - całe zapytanie działa na spójnym stanie indeksu
+        index = self.index
+        # timings - opcjonalny słownik etap -> czas w sekundach (sumowany z wcześniejszymi pomiarami)
+        clock = time.perf_counter()
+
+        def stage(name):
+            nonlocal clock
+            if timings is not None:
+                now = time.perf_counter()
+                timings[name] = timings.get(name, 0.0) + now - clock
+                clock = now
 
-    def search(self, query, top_k=20):
         processed_query = self.process_text(query)
-        query_vector = self.vectorizer.transform([processed_query])
-        
+        stage('analysis')
+        processed_query, corrections = self._correct_query(index, processed_query, similarity_measure)
+        stage('correction')
+        query_vector = index.transform(processed_query)
+        stage('vectorization')
+        if similarity_measure == 'bm25f':
+            # kandydaci z list postingowych wszystkich pól; miary nazw liczone później, tylko dla strony wyników
+            candidates, bm25f = index.bm25f_scores(processed_query, self.field_weights)
+            similarities = {'bm25f': bm25f}
+        else:
+            candidates = index.candidates(query_vector)
+            similarities = index.calculate_similarities(query_vector, candidates)
+
+        stage('scoring')
+        mask = index.filter_mask(filters)
+        stage('filter')
+        result = self._collect_results(index, query_vector, candidates, similarities, similarity_measure,
+                                       mask, top_k, offset)
+        result['corrections'] = corrections
+        stage('topk')
+        return result
+
+    def search_many(self, queries, top_k=20, offset=0, filters=None, similarity_measure=None):
+        # wiele zapytań naraz: wspólna macierz zapytań, jeden iloczyn z indeksem i jedna maska filtrów;
+        # wyniki w tej samej postaci i kolejności co search() dla każdego zapytania
+        similarity_measure = similarity_measure or self.similarity_measure
+        if similarity_measure not in SIMILARITY_MEASURES:
+            raise ValueError(f"Unknown similarity measure: {similarity_measure}")
+        if similarity_measure == 'bm25f':
+            # BM25F liczony na listach postingowych pól - osobno dla każdego zapytania
+            return [self.search(query, top_k, offset, filters, similarity_measure) for query in queries]
+        index = self.index
+        corrected = [self._correct_query(index, self.process_text(query), similarity_measure) for query in queries]
+        query_matrix = index.transform_many([processed_query for processed_query, _ in corrected])
+        mask = index.filter_mask(filters)
         results = []
-        for idx in range(self.tfidf_matrix.shape[0]):
-            doc_vector = self.tfidf_matrix[idx]
-            similarities = self.calculate_similarities(query_vector, doc_vector)
-            
-            similarity_score = similarities[self.similarity_measure]
-            if similarity_score > 0:
-                results.append({
-                    'listing_id': self.listing_ids[idx],
-                    'name': self.original_names[idx],
-                    'similarity_score': similarity_score,
-                    'all_similarities': similarities
-                })
-        
-        results.sort(key=lambda x: x['similarity_score'], reverse=True)
+        for i, (candidates, similarities) in enumerate(index.calculate_similarities_many(query_matrix)):
+            result = self._collect_results(index, query_matrix[i], candidates, similarities, similarity_measure,
+                                           mask, top_k, offset)
+            result['corrections'] = corrected[i][1]
+            results.append(result)
+        return results
+
+    def _correct_query(self, index, processed_query, similarity_measure):
+        if not self.correct_typos:
+            return processed_query, {}
+        # dla BM25F poprawiane są tylko słowa nieobecne w żadnym polu
+        known_terms = index.bm25f.terms if similarity_measure == 'bm25f' else None
+        return index.correct_query(processed_query, known_terms)
+
+    def _collect_results(self, index, query_vector, candidates, similarities, similarity_measure, mask, top_k, offset):
+        matched = np.flatnonzero(similarities[similarity_measure] > 0)
+        total_matches = len(matched)
+        # filtry jako maska przed wyborem top-k, żeby nie tracić trafień
+        if mask is not None:
+            matched = matched[mask[candidates[matched]]]
+        page = self._top_positions(similarities[similarity_measure][matched], offset + top_k)[offset:]
+
+        # słowniki wyników tylko dla zwracanej strony
+        page_rows = matched[page]
+        page_similarities = {name: values[page_rows] for name, values in similarities.items()}
+        if similarity_measure == 'bm25f':
+            page_similarities.update(index.calculate_similarities(query_vector, candidates[page_rows]))
+        results = []
+        for i, pos in enumerate(page_rows):
+            idx = candidates[pos]
+            all_similarities = {name: float(values[i]) for name, values in page_similarities.items()}
+            results.append({
+                'listing_id': int(index.listing_ids[idx]),
+                'name': index.original_names[idx],
+                'similarity_score': all_similarities[similarity_measure],
+                'all_similarities': all_similarities
+            })
         return {
-            'total_matches': len(results),
-            'results': results[:top_k]
-        }
\ No newline at end of file
+            'total_matches': total_matches,
+            'total_filtered': len(matched),
+            'results': results
+        }
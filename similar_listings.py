@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+from search_engine import SearchIndex, fetch_index_rows, listings_fingerprint
+
+# Tabela podobnych ofert: dla każdej oferty N najbliższych sąsiadów wg podobieństwa cosinusowego nazw (TF-IDF).
+# Wiersze posortowane po id oferty - wyszukiwanie binarne w mapowanej z dysku tablicy, bez słownika w pamięci.
+class SimilarListings:
+    def __init__(self, fingerprint, listing_ids, neighbours, scores):
+        self.fingerprint = fingerprint
+        self.listing_ids = listing_ids
+        # id sąsiadów (-1 - brak) i ich podobieństwo, malejąco
+        self.neighbours = neighbours
+        self.scores = scores
+
+    @classmethod
+    def compute(cls, index, top_n=20, chunk_size=None):
+        # iloczyn macierzy znormalizowanych wektorów z jej transpozycją liczony paczkami wierszy -
+        # pamięć ograniczona rozmiarem paczki, a nie kwadratem liczby ofert
+        norms = np.sqrt(np.asarray(index.doc_sq_norms, dtype=np.float64))
+        with np.errstate(divide='ignore'):
+            scale = np.where(norms > 0, 1.0 / norms, 0.0)
+        vectors = index.tfidf_matrix.multiply(scale[:, None]).tocsr().astype(np.float32)
+        transposed = vectors.T.tocsr()
+        listing_ids = np.asarray(index.listing_ids)
+        count = len(listing_ids)
+        # domyślnie paczka o co najwyżej ok. 16M komórek iloczynu
+        chunk_size = chunk_size or max(1, 2 ** 24 // max(count, 1))
+        top_n = min(top_n, max(count - 1, 1))
+        neighbours = np.full((count, top_n), -1, dtype=np.int64)
+        scores = np.zeros((count, top_n), dtype=np.float32)
+        # klucz sortowania: podobieństwo zaokrąglone do 4 miejsc malejąco, przy remisie wcześniejsza oferta
+        tie_breaker = count - 1 - np.arange(count, dtype=np.int64)
+        for start in range(0, count, chunk_size):
+            product = vectors[start:start + chunk_size].dot(transposed).tocsr()
+            rows = np.repeat(np.arange(product.shape[0]), np.diff(product.indptr))
+            rounded = np.rint(product.data * 10000).astype(np.int64)
+            # bez samej oferty i zerowych podobieństw
+            rounded[product.indices == rows + start] = 0
+            keys = np.where(rounded > 0, rounded * count + tie_breaker[product.indices], -1)
+            for row in range(product.shape[0]):
+                row_keys = keys[product.indptr[row]:product.indptr[row + 1]]
+                if len(row_keys) > top_n:
+                    best = np.argpartition(row_keys, len(row_keys) - top_n)[len(row_keys) - top_n:]
+                else:
+                    best = np.arange(len(row_keys))
+                best = best[np.argsort(-row_keys[best])]
+                best = best[row_keys[best] >= 0]
+                neighbours[start + row, :len(best)] = listing_ids[product.indices[product.indptr[row] + best]]
+                scores[start + row, :len(best)] = (row_keys[best] // count) / 10000
+        order = np.argsort(listing_ids, kind='stable')
+        return cls(index.fingerprint, listing_ids[order], neighbours[order], scores[order])
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name in ('listing_ids', 'neighbours', 'scores'):
+            file_path = os.path.join(path, f'{name}.npy')
+            with open(file_path + '.tmp', 'wb') as f:
+                np.save(f, getattr(self, name))
+            os.replace(file_path + '.tmp', file_path)
+        meta_path = os.path.join(path, 'meta.json')
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': self.fingerprint, 'top_n': self.neighbours.shape[1]}, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    @classmethod
+    def load(cls, path):
+        # None, gdy tabeli jeszcze nie policzono
+        try:
+            with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        def load(name):
+            return np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+        return cls(meta['fingerprint'], load('listing_ids'), load('neighbours'), load('scores'))
+
+    def get(self, listing_id, limit=None):
+        # lista (id sąsiada, podobieństwo); None, gdy oferty nie ma w tabeli
+        position = np.searchsorted(self.listing_ids, listing_id)
+        if position >= len(self.listing_ids) or self.listing_ids[position] != listing_id:
+            return None
+        neighbours = self.neighbours[position, :limit]
+        scores = self.scores[position, :limit]
+        return [(int(neighbour), round(float(score), 4)) for neighbour, score in zip(neighbours, scores) if neighbour >= 0]
+
+# Zadanie offline: tabela sąsiadów dla aktualnej zawartości bazy (indeks z dysku, jeśli aktualny)
+def build_similar_listings(db_path='airbnb.db', out_path='similar_listings', index_path='search_index',
+                           top_n=20, chunk_size=None):
+    start_time = time.time()
+    listings = fetch_index_rows(db_path)
+    fingerprint = listings_fingerprint(listings)
+    index = SearchIndex.load(index_path, fingerprint) if index_path else None
+    index = index or SearchIndex.build(listings, fingerprint)
+    SimilarListings.compute(index, top_n, chunk_size).save(out_path)
+    print(f"Top {top_n} similar listings for {len(index.listing_ids)} listings saved to {out_path} "
+          f"in {time.time() - start_time:.1f}s")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precompute similar listings (cosine neighbours of listing names)')
+    parser.add_argument('--db', default='airbnb.db')
+    parser.add_argument('--out', default='similar_listings')
+    parser.add_argument('--index', default='search_index', help='reuse this on-disk index when it is up to date')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='rows per block of the self-product (default: about 16M similarity cells per block)')
+    args = parser.parse_args()
+    build_similar_listings(args.db, args.out, args.index, args.top, args.chunk_size)
@@ -22,6 +22,58 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
+    // podpowiedzi przy pisaniu: zapytanie do /suggest po krótkiej przerwie, poprzednie anulowane
+    const suggestionsList = document.getElementById('search-suggestions');
+    const suggestionsCache = new Map();
+    let suggestTimer = null;
+    let suggestController = null;
+
+    function showSuggestions(suggestions) {
+        suggestionsList.innerHTML = '';
+        suggestions.forEach(suggestion => {
+            const option = document.createElement('option');
+            option.value = suggestion.text;
+            option.label = `${suggestion.listings} listing${suggestion.listings !== 1 ? 's' : ''}`;
+            suggestionsList.appendChild(option);
+        });
+    }
+
+    function loadSuggestions(query) {
+        if (suggestionsCache.has(query)) {
+            showSuggestions(suggestionsCache.get(query));
+            return;
+        }
+        if (suggestController) {
+            suggestController.abort();
+        }
+        suggestController = new AbortController();
+        fetch(`/suggest?q=${encodeURIComponent(query)}`, { signal: suggestController.signal })
+            .then(response => response.json())
+            .then(data => {
+                suggestionsCache.set(query, data.suggestions);
+                if (searchInput.value === query) {
+                    showSuggestions(data.suggestions);
+                }
+            })
+            .catch(error => {
+                if (error.name !== 'AbortError') {
+                    console.error('Suggest error:', error);
+                }
+            });
+    }
+
+    if (suggestionsList) {
+        searchInput.addEventListener('input', function() {
+            clearTimeout(suggestTimer);
+            const query = searchInput.value;
+            if (!/\w$/.test(query)) {
+                showSuggestions([]);
+                return;
+            }
+            suggestTimer = setTimeout(() => loadSuggestions(query), 80);
+        });
+    }
+
     function getFilters() {
         const filters = {};
         
@@ -115,15 +167,136 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // szczegóły oferty - pobierane z /listing/<id> dopiero po rozwinięciu karty
+    function renderDetails(listing) {
+        return `
+            <hr>
+            <h6>Description</h6>
+            <p>${listing.description}</p>
+
+            <h6>Neighborhood overview</h6>
+            <p>${listing.neighborhood_overview || 'No neighborhood overview available.'}</p>
+
+            <div class="additional-details">
+                <p>
+                    <strong>Bedrooms:</strong> ${listing.bedrooms || 'N/A'}<br>
+                    <strong>Beds:</strong> ${listing.beds || 'N/A'}<br>
+                    <strong>Bathrooms:</strong> ${listing.bathrooms || 'N/A'}<br>
+                    <strong>Minimum nights:</strong> ${listing.minimum_nights}<br>
+                    <strong>Maximum nights:</strong> ${listing.maximum_nights}<br>
+                </p>
+            </div>
+
+            <h6>All amenities</h6>
+            <div class="all-amenities">
+                ${listing.amenities.map(amenity => 
+                    `<span class="badge bg-secondary me-1 mb-1">${amenity}</span>`
+                ).join('')}
+            </div>
+
+            <h6 class="mt-4">Host information</h6>
+            <div class="host-info mb-3">
+                <div class="host-header d-flex align-items-center mb-2">
+                    <h6 class="mb-0">Hosted by ${listing.host_name}</h6>
+                    ${listing.host_is_superhost ? '<span class="badge bg-success ms-2">Superhost</span>' : ''}
+                </div>
+                <p class="mb-2">
+                    <strong>Host since:</strong> ${listing.host_since || 'Not specified'}<br>
+                    <strong>Location:</strong> ${listing.host_location || 'Not specified'}<br>
+                    <strong>Response time:</strong> ${listing.host_response_time || 'Not specified'}<br>
+                    <strong>Response rate:</strong> ${listing.host_response_rate || 'Not specified'}<br>
+                    <strong>Acceptance rate:</strong> ${listing.host_acceptance_rate || 'Not specified'}<br>
+                    <strong>Total listings:</strong> ${listing.host_listings_count || '0'}<br>
+                    <strong>Identity verified:</strong> ${listing.host_identity_verified ? 'Yes' : 'No'}
+                </p>
+                ${listing.host_about ? `
+                    <div class="host-about">
+                        <strong>About the host:</strong>
+                        <p class="mb-0">${listing.host_about}</p>
+                    </div>
+                ` : ''}
+            </div>
+
+            <h6>Reviews</h6>
+            <div class="reviews-info mb-3">
+                <div class="reviews-header d-flex align-items-center justify-content-between mb-3">
+                    <div>
+                        <h6 class="mb-0">
+                            <i class="fas fa-star text-warning"></i>
+                            ${listing.review_scores_rating || 'N/A'} · ${listing.number_of_reviews} reviews
+                        </h6>
+                    </div>
+                </div>
+                <div class="review-scores">
+                    ${[
+                        {label: 'Cleanliness', score: listing.review_scores_cleanliness},
+                        {label: 'Accuracy', score: listing.review_scores_accuracy},
+                        {label: 'Communication', score: listing.review_scores_communication},
+                        {label: 'Location', score: listing.review_scores_location},
+                        {label: 'Check-in', score: listing.review_scores_checkin},
+                        {label: 'Value', score: listing.review_scores_value}
+                    ].map(item => `
+                        <div class="review-score-item">
+                            <div class="d-flex justify-content-between align-items-center mb-1">
+                                <span>${item.label}</span>
+                                <span class="score">${item.score || 'N/A'}</span>
+                            </div>
+                            <div class="progress" style="height: 6px;">
+                                <div class="progress-bar bg-success" role="progressbar" 
+                                     style="width: ${(item.score / 5) * 100}%" 
+                                     aria-valuenow="${item.score}" 
+                                     aria-valuemin="0" 
+                                     aria-valuemax="5">
+                                </div>
+                            </div>
+                        </div>
+                    `).join('')}
+                </div>
+            </div>
+
+            <div class="mt-4">
+                <a href="${listing.listing_url}" target="_blank" class="btn airbnb-btn">View on Airbnb</a>
+            </div>
+        `;
+    }
+
+    function loadDetails(listingId, detailsSection) {
+        if (detailsSection.dataset.loaded) {
+            return;
+        }
+        detailsSection.dataset.loaded = 'true';
+        detailsSection.innerHTML = '<div class="text-center"><div class="spinner-border spinner-border-sm" role="status"><span class="visually-hidden">Loading...</span></div></div>';
+        fetch(`/listing/${listingId}`)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`Listing request failed: ${response.status}`);
+                }
+                return response.json();
+            })
+            .then(listing => {
+                detailsSection.innerHTML = renderDetails(listing);
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                delete detailsSection.dataset.loaded;
+                detailsSection.innerHTML = '<div class="alert alert-danger">Could not load listing details.</div>';
+            });
+    }
+
     function displayResults(response) {
         console.log('Received response:', response);
         const resultsContainer = document.getElementById('results-container');
         const results = response.results;
         const totalMatches = response.total_matches;
         const totalFiltered = response.total_filtered;
+        const corrections = Object.entries(response.corrections || {});
+        const correctionsHtml = corrections.length > 0 ? `
+            <div class="alert alert-warning mb-3">
+                Showing results for corrected words: ${corrections.map(([word, term]) => `<em>${word}</em> &rarr; <strong>${term}</strong>`).join(', ')}
+            </div>` : '';
 
         if (!results || results.length === 0) {
-            resultsContainer.innerHTML = '<p>No results found.</p>';
+            resultsContainer.innerHTML = correctionsHtml + '<p>No results found.</p>';
             return;
         }
 
@@ -131,17 +304,17 @@ document.addEventListener('DOMContentLoaded', function() {
             console.log('Result number_of_reviews:', result.number_of_reviews);
         });
 
-        let html = `
+        let html = correctionsHtml + `
             <div class="alert alert-info mb-3">
                 Found ${totalMatches} listing${totalMatches !== 1 ? 's' : ''} matching your search query.
                 ${totalFiltered !== totalMatches ? 
-                    `Showing top ${totalFiltered} results after applying filters.` : 
+                    `${totalFiltered} listing${totalFiltered !== 1 ? 's' : ''} left after applying filters, showing top ${results.length}.` : 
                     ''}
             </div>
             <div class="results-list">
         `;
         results.forEach((result, index) => {
-            const amenitiesHtml = result.amenities.slice(0, 5).map(amenity => 
+            const amenitiesHtml = result.amenities_preview.map(amenity => 
                 `<span class="badge bg-secondary me-1">${amenity}</span>`
             ).join('');
 
@@ -151,7 +324,7 @@ document.addEventListener('DOMContentLoaded', function() {
                         <div class="card-body">
                             <div class="d-flex justify-content-between align-items-start">
                                 <h5 class="card-title">${result.name}</h5>
-                                <button class="btn btn-link expand-btn" data-result-id="${index}">
+                                <button class="btn btn-link expand-btn" data-result-id="${index}" data-listing-id="${result.id}">
                                     <i class="fas fa-chevron-down"></i>
                                 </button>
                             </div>
@@ -170,6 +343,8 @@ document.addEventListener('DOMContentLoaded', function() {
                                         <span class="badge bg-primary">Cosine: ${result.similarity_metrics.cosine}</span>
                                         <span class="badge bg-success">Dice: ${result.similarity_metrics.dice}</span>
                                         <span class="badge bg-info">Jaccard: ${result.similarity_metrics.jaccard}</span>
+                                        ${result.similarity_metrics.bm25f !== undefined ?
+                                            `<span class="badge bg-dark">BM25F: ${result.similarity_metrics.bm25f}</span>` : ''}
                                     </div>
                                 </div>
                                 <div class="amenities mb-2">
@@ -177,93 +352,6 @@ document.addEventListener('DOMContentLoaded', function() {
                                 </div>
                             </div>
                             <div class="detailed-info collapse" id="details-${index}">
-                                <hr>
-                                <h6>Description</h6>
-                                <p>${result.description}</p>
-
-                                <h6>Neighborhood overview</h6>
-                                <p>${result.neighborhood_overview || 'No neighborhood overview available.'}</p>
-                                
-                                <div class="additional-details">
-                                    <p>
-                                        <strong>Bedrooms:</strong> ${result.bedrooms || 'N/A'}<br>
-                                        <strong>Beds:</strong> ${result.beds || 'N/A'}<br>
-                                        <strong>Bathrooms:</strong> ${result.bathrooms || 'N/A'}<br>
-                                        <strong>Minimum nights:</strong> ${result.minimum_nights}<br>
-                                        <strong>Maximum nights:</strong> ${result.maximum_nights}<br>
-                                    </p>
-                                </div>
-                                
-                                <h6>All amenities</h6>
-                                <div class="all-amenities">
-                                    ${result.amenities.map(amenity => 
-                                        `<span class="badge bg-secondary me-1 mb-1">${amenity}</span>`
-                                    ).join('')}
-                                </div>
-
-                                <h6 class="mt-4">Host information</h6>
-                                <div class="host-info mb-3">
-                                    <div class="host-header d-flex align-items-center mb-2">
-                                        <h6 class="mb-0">Hosted by ${result.host_name}</h6>
-                                        ${result.host_is_superhost ? '<span class="badge bg-success ms-2">Superhost</span>' : ''}
-                                    </div>
-                                    <p class="mb-2">
-                                        <strong>Host since:</strong> ${result.host_since || 'Not specified'}<br>
-                                        <strong>Location:</strong> ${result.host_location || 'Not specified'}<br>
-                                        <strong>Response time:</strong> ${result.host_response_time || 'Not specified'}<br>
-                                        <strong>Response rate:</strong> ${result.host_response_rate || 'Not specified'}<br>
-                                        <strong>Acceptance rate:</strong> ${result.host_acceptance_rate || 'Not specified'}<br>
-                                        <strong>Total listings:</strong> ${result.host_listings_count || '0'}<br>
-                                        <strong>Identity verified:</strong> ${result.host_identity_verified ? 'Yes' : 'No'}
-                                    </p>
-                                    ${result.host_about ? `
-                                        <div class="host-about">
-                                            <strong>About the host:</strong>
-                                            <p class="mb-0">${result.host_about}</p>
-                                        </div>
-                                    ` : ''}
-                                </div>
-
-                                <h6>Reviews</h6>
-                                <div class="reviews-info mb-3">
-                                    <div class="reviews-header d-flex align-items-center justify-content-between mb-3">
-                                        <div>
-                                            <h6 class="mb-0">
-                                                <i class="fas fa-star text-warning"></i>
-                                                ${result.review_scores_rating || 'N/A'} · ${result.number_of_reviews} reviews
-                                            </h6>
-                                        </div>
-                                    </div>
-                                    <div class="review-scores">
-                                        ${[
-                                            {label: 'Cleanliness', score: result.review_scores_cleanliness},
-                                            {label: 'Accuracy', score: result.review_scores_accuracy},
-                                            {label: 'Communication', score: result.review_scores_communication},
-                                            {label: 'Location', score: result.review_scores_location},
-                                            {label: 'Check-in', score: result.review_scores_checkin},
-                                            {label: 'Value', score: result.review_scores_value}
-                                        ].map(item => `
-                                            <div class="review-score-item">
-                                                <div class="d-flex justify-content-between align-items-center mb-1">
-                                                    <span>${item.label}</span>
-                                                    <span class="score">${item.score || 'N/A'}</span>
-                                                </div>
-                                                <div class="progress" style="height: 6px;">
-                                                    <div class="progress-bar bg-success" role="progressbar" 
-                                                         style="width: ${(item.score / 5) * 100}%" 
-                                                         aria-valuenow="${item.score}" 
-                                                         aria-valuemin="0" 
-                                                         aria-valuemax="5">
-                                                    </div>
-                                                </div>
-                                            </div>
-                                        `).join('')}
-                                    </div>
-                                </div>
-                                
-                                <div class="mt-4">
-                                    <a href="${result.listing_url}" target="_blank" class="btn airbnb-btn">View on Airbnb</a>
-                                </div>
                             </div>
                         </div>
                     </div>
@@ -286,6 +374,7 @@ document.addEventListener('DOMContentLoaded', function() {
                     icon.classList.remove('fa-chevron-up');
                     icon.classList.add('fa-chevron-down');
                 } else {
+                    loadDetails(this.getAttribute('data-listing-id'), detailsSection);
                     detailsSection.classList.add('show');
                     icon.classList.remove('fa-chevron-down');
                     icon.classList.add('fa-chevron-up');
@@ -0,0 +1,87 @@
+import numpy as np
+
+# Maksymalna odległość edycyjna poprawki; słowa krótsze niż 5 znaków - tylko jedna zmiana
+MAX_EDIT_DISTANCE = 2
+# Usunięcia liczone tylko dla początku słowa (jak w SymSpell) - mniejszy słownik usunięć
+PREFIX_LENGTH = 7
+# Krótszych słów nie poprawiamy - za dużo przypadkowych dopasowań
+MIN_TOKEN_LENGTH = 3
+
+def edit_distance_limit(token):
+    return 1 if len(token) < 5 else MAX_EDIT_DISTANCE
+
+# Wszystkie warianty słowa powstałe przez usunięcie co najwyżej distance znaków (razem ze słowem)
+def deletes(word, distance):
+    variants = {word}
+    level = {word}
+    for _ in range(distance):
+        level = {variant[:i] + variant[i + 1:] for variant in level if len(variant) > 1 for i in range(len(variant))}
+        variants |= level
+    return variants
+
+# Odległość Damerau-Levenshteina (zamiana sąsiednich liter = 1 zmiana); limit + 1, gdy większa od limitu
+def edit_distance(a, b, limit):
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+# Słownik usunięć SymSpell: posortowana tablica wariantów termów (bez co najwyżej MAX_EDIT_DISTANCE znaków)
+# i numery termów; słowo spoza słownika szukane po swoich wariantach wyszukiwaniem binarnym
+class TermCorrector:
+    def __init__(self, deletes, term_ids):
+        self.deletes = deletes
+        self.term_ids = term_ids
+
+    @classmethod
+    def build(cls, terms):
+        pairs = sorted({(variant, term_id) for term_id, term in enumerate(terms.tolist())
+                        for variant in deletes(term[:PREFIX_LENGTH], MAX_EDIT_DISTANCE)})
+        variants = np.array([variant for variant, _ in pairs], dtype=str)
+        term_ids = np.array([term_id for _, term_id in pairs], dtype=np.int32)
+        return cls(variants, term_ids)
+
+    def arrays(self):
+        return {'corrector_deletes': self.deletes, 'corrector_term_ids': self.term_ids}
+
+    @classmethod
+    def from_arrays(cls, load):
+        return cls(load('corrector_deletes'), load('corrector_term_ids'))
+
+    def candidates(self, token, distance):
+        # numery termów, które mogą być w odległości co najwyżej distance od token
+        variants = np.array(sorted(deletes(token[:PREFIX_LENGTH], distance)), dtype=str)
+        starts = np.searchsorted(self.deletes, variants, side='left')
+        ends = np.searchsorted(self.deletes, variants, side='right')
+        if not (ends > starts).any():
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate([self.term_ids[start:end] for start, end in zip(starts, ends)]))
+
+    def correct(self, token, terms, frequencies):
+        # najbliższy term słownika: najmniejsza odległość, potem najwięcej ofert, potem alfabetycznie;
+        # None, gdy brak termu w dopuszczalnej odległości
+        if len(token) < MIN_TOKEN_LENGTH or not token.isalpha():
+            return None
+        distance = edit_distance_limit(token)
+        best = None
+        for term_id in self.candidates(token, distance):
+            if not frequencies[term_id]:
+                continue
+            term = str(terms[term_id])
+            term_distance = edit_distance(token, term, distance)
+            if term_distance <= distance:
+                key = (term_distance, -int(frequencies[term_id]), term)
+                if best is None or key < best:
+                    best = key
+        return best[2] if best else None
@@ -0,0 +1,45 @@
+import numpy as np
+
+# Maksymalna liczba podpowiedzi na prefiks
+SUGGEST_LIMIT = 10
+# Prefiksy do tej długości mają listy podpowiedzi policzone z góry (najszersze zakresy słownika)
+SHORT_PREFIX = 2
+
+# Podpowiedzi słów: posortowany słownik termów, zakres prefiksu wyszukiwaniem binarnym,
+# kolejność wg liczby ofert zawierających term (przy remisie alfabetycznie)
+class TermSuggester:
+    def __init__(self, terms, frequencies, limit=SUGGEST_LIMIT, short_prefix=SHORT_PREFIX):
+        self.terms = terms
+        self.frequencies = frequencies
+        self.limit = limit
+        # pozycja termu w rankingu popularności - mniejsza znaczy lepszy
+        order = np.lexsort((np.arange(len(terms)), -np.asarray(frequencies)))
+        self.ranks = np.empty(len(terms), dtype=np.int64)
+        self.ranks[order] = np.arange(len(terms))
+        self.short_prefix = short_prefix
+        self.top = {}
+        for length in range(1, short_prefix + 1):
+            for prefix in sorted({term[:length] for term in terms.tolist() if len(term) >= length}):
+                self.top[prefix] = self._best(prefix, limit)
+
+    def _best(self, prefix, limit):
+        # termy z danym prefiksem leżą w posortowanej tablicy obok siebie
+        start = np.searchsorted(self.terms, prefix, side='left')
+        end = np.searchsorted(self.terms, prefix + '\U0010ffff', side='left')
+        ranks = self.ranks[start:end]
+        if len(ranks) > limit:
+            best = np.argpartition(ranks, limit - 1)[:limit]
+        else:
+            best = np.arange(len(ranks))
+        best = start + best[np.argsort(ranks[best])]
+        return best[self.frequencies[best] > 0]
+
+    def suggest(self, prefix, limit=None):
+        # lista (term, liczba ofert), najpopularniejsze najpierw
+        limit = min(limit or self.limit, self.limit)
+        if not prefix:
+            return []
+        best = self.top.get(prefix) if len(prefix) <= self.short_prefix else None
+        if best is None:
+            best = self._best(prefix, limit)
+        return [(str(self.terms[i]), int(self.frequencies[i])) for i in best[:limit]]
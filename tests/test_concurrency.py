@@ -0,0 +1,28 @@
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generate_db import generate_db
+from search_engine import SearchEngine, SIMILARITY_MEASURES
+
+QUERIES = ['sea view apartment', 'villa with pool', 'cozy studio in the center', 'taormina', 'xyzzy']
+FILTERS = [None, {'price_range': [50, 300], 'amenities': ['Wifi'], 'room_type': 'Entire home/apt'}]
+
+# Wyniki zapytań wykonywanych równolegle na jednym silniku muszą być identyczne z wykonaniem po kolei
+def test_parallel_search_matches_serial(tmp_path):
+    db_path = str(tmp_path / 'listings.db')
+    generate_db(db_path, 2000, seed=1)
+    engine = SearchEngine(db_path)
+    jobs = [(query, measure, filters) for query in QUERIES for measure in SIMILARITY_MEASURES for filters in FILTERS]
+
+    def run(job):
+        query, measure, filters = job
+        return json.dumps(engine.search(query, top_k=20, filters=filters, similarity_measure=measure))
+
+    expected = [run(job) for job in jobs]
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(run, jobs * 20))
+    assert results == expected * 20